@@ -0,0 +1,320 @@
+"""
+MINERVA Sentinel - Offline backtesting engine
+
+Replays the calculate_anomaly_scores() logic over every sliding window of a
+company's stored metrics_timeseries / complaints history and scores the
+alarms against historical_incidents: detection lead time and false-alarm rate
+for any number of (|z| threshold, anomalous-metric count) settings.
+
+Data is loaded once per company; every window is then evaluated with
+vectorized NumPy ops (searchsorted window bounds + prefix sums), so a month of
+minute data across a whole threshold grid takes well under a second.
+
+Usage:
+    python backtest.py us competitor_a --z 1.5 2 2.5 3 --min-metrics 1 2 3 --processes 4
+"""
+
+import json
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Sequence
+
+from sentinel import WINDOW_MINUTES, DROP_LAG_SAMPLES, BASELINE_DAYS, Z_THRESHOLD, MIN_ANOMALOUS_METRICS
+
+PAGE_SIZE = 1000
+
+
+def _to_epoch(timestamp: str) -> float:
+    """
+    Supabase ISO timestamp -> UTC epoch seconds (naive timestamps are UTC)
+    """
+    parsed = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _fetch_all(query) -> List[Dict]:
+    """
+    Page through a PostgREST query (responses are capped at 1000 rows)
+
+    postgrest-py 0.13 treats range()'s `end` as exclusive (it sends
+    `Range: start-(end-1)`), so each call asks for exactly PAGE_SIZE rows.
+    Paging stops on an empty page, not a short one, so a server-side cap
+    below PAGE_SIZE can't silently truncate the history.
+    """
+    rows = []
+    start = 0
+    while True:
+        page = query.range(start, start + PAGE_SIZE).execute().data
+        if len(page) > PAGE_SIZE:
+            raise RuntimeError(
+                f"Requested {PAGE_SIZE} rows at offset {start} but got {len(page)}; "
+                "check postgrest range() semantics"
+            )
+        if not page:
+            return rows
+        rows.extend(page)
+        start += len(page)
+
+
+def load_company_data(company_id: str, supabase, since: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Load everything a backtest needs for one company in a single pass
+    Returns sorted NumPy arrays (epoch seconds / values)
+    """
+
+    def query(table, columns, time_column):
+        q = supabase.table(table).select(columns).eq('company_id', company_id)
+        if since:
+            q = q.gte(time_column, since)
+        # Timestamps aren't unique; id keeps offset paging stable across pages
+        return q.order(time_column).order('id')
+
+    happiness = _fetch_all(
+        query('metrics_timeseries', 'timestamp,value', 'timestamp').eq('metric_type', 'happiness')
+    )
+    complaints = _fetch_all(query('complaints', 'timestamp,sentiment_score', 'timestamp'))
+    incidents = _fetch_all(query('historical_incidents', 'id,occurred_at', 'occurred_at'))
+
+    return build_company_data(happiness, complaints, incidents)
+
+
+def build_company_data(happiness: List[Dict], complaints: List[Dict], incidents: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Convert raw rows into the sorted arrays used by run_backtest()
+    """
+    happiness_ts = np.array([_to_epoch(m['timestamp']) for m in happiness], dtype=np.float64)
+    happiness_values = np.array([float(m['value']) for m in happiness], dtype=np.float64)
+    order = np.argsort(happiness_ts, kind='stable')
+
+    complaint_ts = np.array([_to_epoch(c['timestamp']) for c in complaints], dtype=np.float64)
+    # Mirror `if c.get('sentiment_score')`: missing and zero scores are ignored
+    complaint_scores = np.array(
+        [float(c['sentiment_score']) if c.get('sentiment_score') else 0.0 for c in complaints],
+        dtype=np.float64
+    )
+    complaint_order = np.argsort(complaint_ts, kind='stable')
+
+    incident_ts = np.sort(np.array([_to_epoch(i['occurred_at']) for i in incidents], dtype=np.float64))
+
+    return {
+        'happiness_ts': happiness_ts[order],
+        'happiness_values': happiness_values[order],
+        'complaint_ts': complaint_ts[complaint_order],
+        'complaint_scores': complaint_scores[complaint_order],
+        'incident_ts': incident_ts,
+    }
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    return np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+
+
+def compute_window_z_scores(data: Dict[str, np.ndarray], eval_times: np.ndarray) -> np.ndarray:
+    """
+    Z-scores calculate_anomaly_scores() would produce at each evaluation time
+    Returns array of shape (3, len(eval_times)): happiness_drop, complaint_velocity,
+    sentiment. NaN marks a z-score the live code would not compute.
+    """
+    window = WINDOW_MINUTES * 60
+    baseline = BASELINE_DAYS * 24 * 3600
+
+    # Happiness: recent window [t - 10min, t] and baseline [t - 30d, t]
+    h_ts = data['happiness_ts']
+    h = data['happiness_values']
+    lo = np.searchsorted(h_ts, eval_times - window, side='left')
+    hi = np.searchsorted(h_ts, eval_times, side='right')
+    base_lo = np.searchsorted(h_ts, eval_times - baseline, side='left')
+
+    recent_count = hi - lo
+    if len(h):
+        first = h[np.minimum(lo, len(h) - 1)]
+        last = h[np.maximum(hi - 1, 0)]
+        happiness_drop = np.where(recent_count >= 2, first - last, 0.0)
+    else:
+        happiness_drop = np.zeros(len(eval_times))
+
+    # Historical lagged drops d[i] = h[i] - h[i + lag]; baseline uses i in [base_lo, hi - lag)
+    lag = DROP_LAG_SAMPLES
+    drops = h[:-lag] - h[lag:] if len(h) > lag else np.zeros(0)
+    s1 = _prefix(drops)
+    s2 = _prefix(drops * drops)
+    n_drops = (hi - base_lo) - lag
+    valid = ((hi - base_lo) > 1) & (n_drops > 0)
+    start = np.where(valid, base_lo, 0)
+    end = np.where(valid, hi - lag, 0)
+    n = np.where(valid, n_drops, 1)
+
+    mean_drop = (s1[end] - s1[start]) / n
+    variance = np.maximum((s2[end] - s2[start]) / n - mean_drop ** 2, 0.0)
+    std_drop = np.sqrt(variance)
+    # np.std() of a constant series is exactly 0; prefix sums leave rounding noise
+    std_drop = np.where(std_drop > 1e-9, std_drop, 1.0)
+    happiness_z = np.where(valid, (happiness_drop - mean_drop) / std_drop, np.nan)
+
+    # Complaints in [t - 10min, t]
+    c_ts = data['complaint_ts']
+    c_lo = np.searchsorted(c_ts, eval_times - window, side='left')
+    c_hi = np.searchsorted(c_ts, eval_times, side='right')
+    complaint_count = (c_hi - c_lo).astype(np.float64)
+
+    complaint_velocity = complaint_count / float(WINDOW_MINUTES) * 60
+    # Live code derives the "historical" rate from the recent complaints too
+    historical_rate = complaint_count / (BASELINE_DAYS * 24)
+    velocity_z = (complaint_velocity - historical_rate) / np.maximum(historical_rate, 1)
+
+    scores = data['complaint_scores']
+    score_sum = _prefix(scores)
+    score_count = _prefix((scores != 0).astype(np.float64))
+    n_scored = score_count[c_hi] - score_count[c_lo]
+    avg_sentiment = np.where(n_scored > 0, (score_sum[c_hi] - score_sum[c_lo]) / np.maximum(n_scored, 1), 0.0)
+    sentiment_z = avg_sentiment * -10
+
+    return np.vstack([happiness_z, velocity_z, sentiment_z])
+
+
+def _evaluation_times(data: Dict[str, np.ndarray], step_seconds: int) -> np.ndarray:
+    stamps = [a for a in (data['happiness_ts'], data['complaint_ts']) if len(a)]
+    if not stamps:
+        return np.zeros(0)
+    start = min(a[0] for a in stamps)
+    end = max(a[-1] for a in stamps)
+    return np.arange(start, end + step_seconds, step_seconds, dtype=np.float64)
+
+
+def run_backtest(
+    data: Dict[str, np.ndarray],
+    z_thresholds: Sequence[float] = (Z_THRESHOLD,),
+    min_metrics: Sequence[int] = (MIN_ANOMALOUS_METRICS,),
+    step_seconds: int = 60,
+    horizon_minutes: int = 60,
+    grace_minutes: int = 30,
+) -> List[Dict[str, Any]]:
+    """
+    Evaluate every (z_threshold, min_metrics) setting over all sliding windows
+
+    An alarm is the first window of a run of consecutive firing windows. It is a
+    true alarm if it starts within horizon_minutes before (or grace_minutes after)
+    an incident's occurred_at, otherwise a false alarm. Lead time is measured from
+    the first firing window in the horizon to occurred_at.
+    """
+    eval_times = _evaluation_times(data, step_seconds)
+    settings = [(float(z), int(k)) for z in z_thresholds for k in min_metrics]
+    if len(eval_times) == 0:
+        return [_summarize(z, k, 0, 0, [], len(data['incident_ts']), 0.0) for z, k in settings]
+
+    abs_z = np.abs(compute_window_z_scores(data, eval_times))
+    thresholds = np.array([z for z, _ in settings])[:, None, None]
+    required = np.array([k for _, k in settings])[:, None]
+
+    # (settings, windows): NaN compares False, same as a missing z-score
+    with np.errstate(invalid='ignore'):
+        anomalous_count = (abs_z[None, :, :] > thresholds).sum(axis=1)
+    firing = anomalous_count >= required
+
+    alarm_starts = firing & ~np.concatenate(
+        [np.zeros((len(settings), 1), dtype=bool), firing[:, :-1]], axis=1
+    )
+
+    # Windows that count as "near an incident" for true/false classification
+    incidents = data['incident_ts']
+    horizon = horizon_minutes * 60
+    near = np.zeros(len(eval_times) + 1, dtype=np.int64)
+    np.add.at(near, np.searchsorted(eval_times, incidents - horizon, side='left'), 1)
+    np.add.at(near, np.searchsorted(eval_times, incidents + grace_minutes * 60, side='right'), -1)
+    near_incident = np.cumsum(near[:-1]) > 0
+
+    total_alarms = alarm_starts.sum(axis=1)
+    false_alarms = (alarm_starts & ~near_incident[None, :]).sum(axis=1)
+
+    # First firing window within each incident's horizon
+    lead_times = [[] for _ in settings]
+    for occurred in incidents:
+        a = np.searchsorted(eval_times, occurred - horizon, side='left')
+        b = np.searchsorted(eval_times, occurred, side='right')
+        if a >= b:
+            continue
+        segment = firing[:, a:b]
+        hit = segment.any(axis=1)
+        first = segment.argmax(axis=1)
+        for s in np.nonzero(hit)[0]:
+            lead_times[s].append((occurred - eval_times[a + first[s]]) / 60.0)
+
+    days = max((eval_times[-1] - eval_times[0]) / 86400.0, 1 / 1440)
+
+    return [
+        _summarize(z, k, int(total_alarms[s]), int(false_alarms[s]), lead_times[s], len(incidents), days)
+        for s, (z, k) in enumerate(settings)
+    ]
+
+
+def _summarize(z: float, k: int, alarms: int, false_alarms: int, lead_times: List[float],
+               incidents: int, days: float) -> Dict[str, Any]:
+    return {
+        'z_threshold': z,
+        'min_metrics': k,
+        'alarms': alarms,
+        'false_alarms': false_alarms,
+        'false_alarm_rate': round(false_alarms / alarms, 4) if alarms else 0.0,
+        'false_alarms_per_day': round(false_alarms / days, 3) if days else 0.0,
+        'incidents': incidents,
+        'detected': len(lead_times),
+        'recall': round(len(lead_times) / incidents, 4) if incidents else None,
+        'mean_lead_time_min': round(float(np.mean(lead_times)), 1) if lead_times else None,
+        'median_lead_time_min': round(float(np.median(lead_times)), 1) if lead_times else None,
+    }
+
+
+def _backtest_company(company_id: str, since: Optional[str], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Worker entry point: each process builds its own lazy Supabase client
+    """
+    from clients import get_supabase
+
+    data = load_company_data(company_id, get_supabase(), since)
+    return {'company_id': company_id, 'results': run_backtest(data, **options)}
+
+
+def backtest_companies(company_ids: List[str], since: Optional[str] = None,
+                       processes: Optional[int] = None, **options) -> List[Dict[str, Any]]:
+    """
+    Backtest several companies, optionally across a process pool
+    """
+    if not processes or processes <= 1 or len(company_ids) <= 1:
+        return [_backtest_company(c, since, options) for c in company_ids]
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_backtest_company, c, since, options) for c in company_ids]
+        return [f.result() for f in futures]
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Replay Sentinel over historical data")
+    parser.add_argument("company_ids", nargs="+")
+    parser.add_argument("--since", help="ISO timestamp to start loading from")
+    parser.add_argument("--z", type=float, nargs="+", default=[Z_THRESHOLD])
+    parser.add_argument("--min-metrics", type=int, nargs="+", default=[MIN_ANOMALOUS_METRICS])
+    parser.add_argument("--step", type=int, default=60, help="Seconds between evaluated windows")
+    parser.add_argument("--horizon", type=int, default=60, help="Minutes before an incident an alarm counts")
+    parser.add_argument("--grace", type=int, default=30, help="Minutes after an incident an alarm counts")
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    report = backtest_companies(
+        args.company_ids,
+        since=args.since,
+        processes=args.processes,
+        z_thresholds=args.z,
+        min_metrics=args.min_metrics,
+        step_seconds=args.step,
+        horizon_minutes=args.horizon,
+        grace_minutes=args.grace,
+    )
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,143 @@
+"""
+Lazily constructed, shared clients for the AI service (Gemini + Supabase)
+
+Nothing here touches the network or credentials at import time. The first
+caller of get_supabase() / get_model() pays the construction cost, or
+warm_up() can be called up front (main.py does so on startup).
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_MODEL = 'gemini-2.0-flash-exp'
+
+# Tables read through the shared query cache (invalidated by change events)
+CACHED_TABLES = ['metrics_timeseries', 'complaints', 'brand_profiles', 'historical_incidents', 'outage_predictions']
+
+_lock = threading.RLock()
+_genai = None
+_supabase = None
+_query_cache = None
+_models: Dict[str, Any] = {}
+_warm_up_error: Optional[str] = None
+
+
+def _gemini():
+    """
+    Import and configure google.generativeai once
+    """
+    global _genai
+
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _genai = genai
+
+    return _genai
+
+
+def get_model(name: str = DEFAULT_MODEL):
+    """
+    Shared GenerativeModel instance per model name
+    """
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                model = _gemini().GenerativeModel(name)
+                _models[name] = model
+
+    return model
+
+
+def generation_config(**kwargs):
+    """
+    Build a GenerationConfig without importing genai at module import
+    """
+    return _gemini().types.GenerationConfig(**kwargs)
+
+
+def get_supabase():
+    """
+    Shared Supabase client, created on first use
+    """
+    global _supabase
+
+    if _supabase is None:
+        with _lock:
+            if _supabase is None:
+                from supabase import create_client
+                _supabase = create_client(
+                    os.getenv("SUPABASE_URL"),
+                    os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+                )
+
+    return _supabase
+
+
+def get_query_cache():
+    """
+    Shared two-tier read cache (see query_cache.py)
+    """
+    global _query_cache
+
+    if _query_cache is None:
+        with _lock:
+            if _query_cache is None:
+                from query_cache import from_env
+                _query_cache = from_env("ai-service", CACHED_TABLES)
+
+    return _query_cache
+
+
+def cached_supabase():
+    """
+    Read-through view of the Supabase client for cacheable queries
+    """
+    return get_query_cache().wrap(get_supabase())
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Eagerly build every client so the first request doesn't pay for it
+    Returns per-client construction time in milliseconds
+    """
+    global _warm_up_error
+
+    timings = {}
+    try:
+        start = time.perf_counter()
+        get_supabase()
+        timings['supabase_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        get_query_cache()
+        timings['query_cache_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        get_model(DEFAULT_MODEL)
+        timings['gemini_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        _warm_up_error = None
+    except Exception as e:
+        _warm_up_error = str(e)
+        raise
+
+    return timings
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    Report which clients have been built (cheap, never constructs anything)
+    """
+    return {
+        "ready": _supabase is not None and DEFAULT_MODEL in _models,
+        "supabase": _supabase is not None,
+        "gemini": DEFAULT_MODEL in _models,
+        "error": _warm_up_error,
+    }
@@ -5,9 +5,7 @@ Complaint summarization with clustering using Gemini Flash
 import json
 from typing import Dict, Any, List
 from datetime import datetime, timedelta
-import google.generativeai as genai
-
-flash_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+from clients import get_model, get_query_cache
 
 async def generate_complaint_summary(company_id: str, time_range: str, supabase) -> Dict[str, Any]:
     """
@@ -23,10 +21,11 @@ async def generate_complaint_summary(company_id: str, time_range: str, supabase)
     }
 
     hours = range_map.get(time_range, 24)
-    since = (datetime.now() - timedelta(hours=hours)).isoformat()
+    # Whole minutes, so repeated summaries share one cached read
+    since = (datetime.now() - timedelta(hours=hours)).replace(second=0, microsecond=0).isoformat()
 
     # Fetch complaints
-    response = supabase.table('complaints')\
+    response = get_query_cache().wrap(supabase).table('complaints')\
         .select('*')\
         .eq('company_id', company_id)\
         .gte('timestamp', since)\
@@ -93,7 +92,7 @@ async def summarize_category(category: str, complaints: List[str]) -> str:
     Provide a brief summary that captures the essence of these complaints.
     """
 
-    response = flash_model.generate_content(prompt)
+    response = get_model().generate_content(prompt)
     summary = response.text.strip()
 
     return summary
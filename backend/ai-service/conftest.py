@@ -0,0 +1,89 @@
+"""
+Shared test doubles for the AI service tests
+"""
+
+from collections import defaultdict
+
+import pytest
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """
+    Records a supabase builder chain; execute() runs it against FakeSupabase
+    """
+
+    def __init__(self, db, table, action=None, payload=None):
+        self.db = db
+        self.table = table
+        self.action = action
+        self.payload = payload
+        self.ops = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            if name in ('insert', 'upsert'):
+                self.action, self.payload = name, args[0]
+            else:
+                self.ops.append((name, args, kwargs))
+            return self
+        return record
+
+    def _matches(self, row):
+        for name, args, _ in self.ops:
+            if name == 'eq' and row.get(args[0]) != args[1]:
+                return False
+            if name == 'in_' and row.get(args[0]) not in args[1]:
+                return False
+        return True
+
+    def execute(self):
+        if self.db.fail:
+            raise RuntimeError("database unavailable")
+
+        if self.action is not None:
+            self.db.requests.append((self.table, self.action, self.payload))
+            if self.action == 'rpc' and self.table == 'apply_complaint_scores':
+                # Same semantics as the SQL function in schema.sql
+                for score in self.payload['scores']:
+                    for row in self.db.tables['complaints']:
+                        if row['id'] == score['id'] and row['company_id'] == score['company_id']:
+                            row.update({k: score[k] for k in ('sentiment', 'sentiment_score', 'category')})
+            elif self.action == 'insert':
+                rows = self.payload if isinstance(self.payload, list) else [self.payload]
+                self.db.tables[self.table].extend(dict(r) for r in rows)
+            return FakeResponse([])
+
+        self.db.fetches += 1
+        if self.db.during_fetch is not None:
+            self.db.during_fetch()
+        return FakeResponse([dict(r) for r in self.db.tables[self.table] if self._matches(r)])
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the supabase client: selects filter `tables`,
+    writes are applied there and recorded in `requests`
+    """
+
+    def __init__(self):
+        self.tables = defaultdict(list)
+        self.requests = []
+        self.fetches = 0
+        self.fail = False
+        self.during_fetch = None
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, fn, params):
+        return FakeQuery(self, fn, 'rpc', params)
+
+
+@pytest.fixture
+def supabase():
+    return FakeSupabase()
@@ -0,0 +1,442 @@
+"""
+Streaming complaint ingestion with micro-batched sentiment scoring
+
+Complaints arrive one at a time (NDJSON), are grouped into micro-batches by
+count or latency deadline, scored with analyze_sentiment_batch() and written
+back to `complaints` with one bulk request per batch. This keeps
+`sentiment_score` / `category` fresh for calculate_anomaly_scores().
+
+Stages:  intake queue -> batch + score -> upsert queue -> bulk write
+
+Both queues are bounded: when scoring or the database falls behind, submit()
+waits, the NDJSON endpoint stops reading the request body and the client is
+slowed down by TCP flow control instead of the service buffering unboundedly.
+
+New complaints are inserted. Records with an `id` re-score an existing
+complaint: the stored text is looked up (scoped to the record's company_id,
+unknown ids are dropped) and only the sentiment columns are updated, through
+the apply_complaint_scores() function in schema.sql.
+
+A complaint that can't be scored (Gemini error, missing or malformed result)
+is still inserted if it is new, with null sentiment columns, so the endpoint
+never drops the only copy of its text. Each request can pass an IngestReport
+to find out what happened to its own complaints and wait for just those.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sentiment import analyze_sentiment_batch
+
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "50"))
+MAX_LATENCY_MS = int(os.getenv("INGEST_MAX_LATENCY_MS", "500"))
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "1000"))
+UPSERT_QUEUE_SIZE = 4
+
+SENTIMENTS = {'positive', 'negative', 'neutral'}
+SCORE_COLUMNS = ('sentiment', 'sentiment_score', 'category')
+UNSCORED = {'sentiment': None, 'sentiment_score': None, 'category': None}
+MAX_REPORT_ERRORS = 20
+
+logger = logging.getLogger(__name__)
+
+
+class _StageCounter:
+    """
+    Items processed and time spent in one pipeline stage
+    """
+
+    def __init__(self):
+        self.items = 0
+        self.batches = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+
+    def record(self, items: int, seconds: float):
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+
+    def snapshot(self, uptime: float) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "failures": self.failures,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / uptime, 2) if uptime > 0 else 0.0,
+            "items_per_busy_second": round(self.items / self.busy_seconds, 2) if self.busy_seconds else 0.0,
+        }
+
+
+def validate_complaint(item: Any) -> Dict[str, Any]:
+    """
+    Normalize one NDJSON record; raises ValueError when unusable
+    Records with an `id` re-score a stored complaint and need no text.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("record must be a JSON object")
+    if not item.get('company_id') or not isinstance(item.get('company_id'), str):
+        raise ValueError("company_id is required")
+
+    if item.get('id') is not None:
+        try:
+            return {'company_id': item['company_id'], 'id': int(item['id'])}
+        except (TypeError, ValueError):
+            raise ValueError("id must be an integer")
+
+    if not item.get('text') or not isinstance(item.get('text'), str):
+        raise ValueError("text is required")
+
+    return {
+        'company_id': item['company_id'],
+        'text': item['text'],
+        'timestamp': item.get('timestamp') or datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class IngestReport:
+    """
+    Outcome of one request's complaints, filled in as their batches finish
+    """
+
+    def __init__(self):
+        self.scored = 0
+        self.unscored = 0
+        self.unknown_ids = 0
+        self.stored = 0
+        self.write_failures = 0
+        self.errors: List[str] = []
+        self._pending = 0
+        self._done = asyncio.Event()
+        self._done.set()
+
+    def _add_pending(self):
+        self._pending += 1
+        self._done.clear()
+
+    def _finish(self):
+        self._pending -= 1
+        if self._pending <= 0:
+            self._done.set()
+
+    async def wait(self):
+        """
+        Until every complaint submitted with this report is written or dropped
+        (independent of other requests sharing the pipeline)
+        """
+        await self._done.wait()
+
+    def add_error(self, error: str):
+        if error not in self.errors and len(self.errors) < MAX_REPORT_ERRORS:
+            self.errors.append(error)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "scored": self.scored,
+            "unscored": self.unscored,
+            "unknown_ids": self.unknown_ids,
+            "stored": self.stored,
+            "write_failures": self.write_failures,
+            "pipeline_errors": self.errors,
+        }
+
+
+def _score_fields(result: Any) -> Optional[Dict]:
+    """
+    Sentiment columns from one model result, None when it is unusable
+    """
+    if not isinstance(result, dict):
+        return None
+    try:
+        score = max(-1.0, min(1.0, float(result.get('score'))))
+    except (TypeError, ValueError):
+        return None
+    sentiment = result.get('sentiment')
+    return {
+        'sentiment': sentiment if sentiment in SENTIMENTS else None,
+        'sentiment_score': score,
+        'category': result.get('category') or 'other',
+    }
+
+
+def _apply_scores(batch: List[Dict], results: Any) -> List[Tuple[Optional[Dict], bool]]:
+    """
+    Merge model output into complaint rows: one (row, scored) per complaint
+    Existing complaints only carry id, company_id and the sentiment columns.
+    Unscorable new complaints are inserted with null sentiment columns;
+    unscorable existing complaints are left as stored (row is None).
+    """
+    if not isinstance(results, list):
+        results = []
+
+    merged = []
+    for i, complaint in enumerate(batch):
+        fields = _score_fields(results[i]) if i < len(results) else None
+        if fields is not None and 'id' in complaint:
+            merged.append(({'id': complaint['id'], 'company_id': complaint['company_id'], **fields}, True))
+        elif fields is not None:
+            merged.append(({**complaint, **fields}, True))
+        elif 'id' in complaint:
+            merged.append((None, False))
+        else:
+            merged.append(({**complaint, **UNSCORED}, False))
+
+    return merged
+
+
+class ComplaintIngestPipeline:
+    """
+    Long-lived pipeline shared by all ingest requests in this process
+    """
+
+    def __init__(
+        self,
+        get_supabase: Callable,
+        score_batch: Callable = analyze_sentiment_batch,
+        on_write: Optional[Callable[[List[Dict]], None]] = None,
+        batch_size: int = BATCH_SIZE,
+        max_latency_ms: int = MAX_LATENCY_MS,
+        queue_size: int = QUEUE_SIZE,
+    ):
+        self._get_supabase = get_supabase
+        self._score_batch = score_batch
+        self._on_write = on_write
+        self.batch_size = batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.queue_size = queue_size
+
+        self._intake: Optional[asyncio.Queue] = None
+        self._writes: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._started_at = time.monotonic()
+
+        self.received = 0
+        self.rejected = 0
+        self.unknown_ids = 0
+        self.backpressure_waits = 0
+        self.scoring = _StageCounter()
+        self.upserting = _StageCounter()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks) and not any(t.done() for t in self._tasks)
+
+    def start(self):
+        """
+        Start stage workers on the running event loop (idempotent)
+        """
+        if self.running:
+            return
+        self._intake = asyncio.Queue(maxsize=self.queue_size)
+        self._writes = asyncio.Queue(maxsize=UPSERT_QUEUE_SIZE)
+        self._started_at = time.monotonic()
+        self._tasks = [
+            asyncio.create_task(self._score_loop()),
+            asyncio.create_task(self._upsert_loop()),
+        ]
+
+    async def stop(self):
+        """
+        Flush everything already accepted, then stop the workers
+        """
+        if not self.running:
+            return
+        await self._intake.join()
+        await self._writes.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, complaint: Dict[str, Any], report: Optional[IngestReport] = None):
+        """
+        Enqueue one validated complaint, waiting while the pipeline is full
+        """
+        self.start()
+        self.received += 1
+        if report is not None:
+            report._add_pending()
+        if self._intake.full():
+            self.backpressure_waits += 1
+        await self._intake.put((complaint, report))
+
+    async def _next_batch(self) -> List[Dict]:
+        """
+        Block for the first item, then fill until batch_size or the deadline
+        """
+        batch = [await self._intake.get()]
+        deadline = time.monotonic() + self.max_latency
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._intake.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    def _score_sync(self, texts: List[str]) -> Any:
+        # analyze_sentiment_batch() blocks on the Gemini client; running it on
+        # a worker thread keeps intake (and the Sentinel stream) responsive
+        return asyncio.run(self._score_batch(texts))
+
+    def _load_existing(self, complaints: List[Dict]) -> Dict[Tuple[str, int], str]:
+        """
+        Stored text of the complaints being re-scored, keyed by (company_id, id)
+        One query per company, so an id only resolves within its own tenant.
+        """
+        ids = defaultdict(list)
+        for complaint in complaints:
+            if 'id' in complaint:
+                ids[complaint['company_id']].append(complaint['id'])
+
+        supabase = self._get_supabase()
+        found = {}
+        for company_id, company_ids in ids.items():
+            rows = supabase.table('complaints')\
+                .select('id,text')\
+                .eq('company_id', company_id)\
+                .in_('id', company_ids)\
+                .execute().data
+            for row in rows:
+                found[(company_id, int(row['id']))] = row['text']
+
+        return found
+
+    async def _score_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            start = time.monotonic()
+            try:
+                known = {}
+                missing_error = "complaint id not found for company_id"
+                if any('id' in c for c, _ in batch):
+                    try:
+                        known = await loop.run_in_executor(None, self._load_existing, [c for c, _ in batch])
+                    except Exception as e:
+                        logger.exception("Complaint lookup failed for batch of %d", len(batch))
+                        missing_error = f"lookup failed: {e}"
+
+                # Existing complaints are scored on their stored text
+                items = []
+                for complaint, report in batch:
+                    if 'id' in complaint:
+                        text = known.get((complaint['company_id'], complaint['id']))
+                        if text is None:
+                            self.unknown_ids += 1
+                            if report is not None:
+                                report.unknown_ids += 1
+                                report.add_error(missing_error)
+                                report._finish()
+                            continue
+                        complaint = {**complaint, 'text': text}
+                    items.append((complaint, report))
+
+                error = "model returned no usable score"
+                results = []
+                if items:
+                    try:
+                        results = await loop.run_in_executor(None, self._score_sync, [c['text'] for c, _ in items])
+                    except Exception as e:
+                        logger.exception("Complaint scoring failed for batch of %d", len(items))
+                        results, error = None, f"scoring failed: {e}"
+
+                writes = []
+                scored = 0
+                for (row, ok), (_, report) in zip(_apply_scores([c for c, _ in items], results), items):
+                    scored += ok
+                    if report is not None:
+                        if ok:
+                            report.scored += 1
+                        else:
+                            report.unscored += 1
+                            report.add_error(error)
+                    if row is not None:
+                        writes.append((row, report))
+                    elif report is not None:
+                        report._finish()
+
+                self.scoring.failures += len(items) - scored
+                self.scoring.record(scored, time.monotonic() - start)
+                if writes:
+                    await self._writes.put(writes)
+            finally:
+                for _ in batch:
+                    self._intake.task_done()
+
+    async def _upsert_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            writes = await self._writes.get()
+            rows = [row for row, _ in writes]
+            start = time.monotonic()
+            try:
+                await loop.run_in_executor(None, self._write_rows, rows)
+                self.upserting.record(len(rows), time.monotonic() - start)
+                for _, report in writes:
+                    if report is not None:
+                        report.stored += 1
+            except Exception as e:
+                self.upserting.failures += len(rows)
+                logger.exception("Complaint upsert failed for batch of %d", len(rows))
+                for _, report in writes:
+                    if report is not None:
+                        report.write_failures += 1
+                        report.add_error(f"write failed: {e}")
+            finally:
+                for _, report in writes:
+                    if report is not None:
+                        report._finish()
+                self._writes.task_done()
+
+    def _write_rows(self, rows: List[Dict]):
+        """
+        One bulk request per row shape. New complaints are inserted; existing
+        ones only get their sentiment columns updated (apply_complaint_scores,
+        matched on id and company_id), so a re-score can't rewrite a
+        complaint's tenant or text or insert rows with explicit ids.
+        """
+        existing = [r for r in rows if 'id' in r]
+        new = [r for r in rows if 'id' not in r]
+        supabase = self._get_supabase()
+
+        if existing:
+            scores = [{k: r[k] for k in ('id', 'company_id') + SCORE_COLUMNS} for r in existing]
+            supabase.rpc('apply_complaint_scores', {'scores': scores}).execute()
+        if new:
+            supabase.table('complaints').insert(new, returning='minimal').execute()
+
+        if self._on_write is not None:
+            self._on_write(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self._started_at
+        return {
+            "running": self.running,
+            "uptime_seconds": round(uptime, 1),
+            "batch_size": self.batch_size,
+            "max_latency_ms": int(self.max_latency * 1000),
+            "intake": {
+                "received": self.received,
+                "rejected": self.rejected,
+                "unknown_ids": self.unknown_ids,
+                "queued": self._intake.qsize() if self._intake else 0,
+                "capacity": self.queue_size,
+                "backpressure_waits": self.backpressure_waits,
+                "items_per_second": round(self.received / uptime, 2) if uptime > 0 else 0.0,
+            },
+            "scoring": self.scoring.snapshot(uptime),
+            "upsert": {
+                **self.upserting.snapshot(uptime),
+                "queued_batches": self._writes.qsize() if self._writes else 0,
+            },
+        }
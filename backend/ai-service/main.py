@@ -1,15 +1,60 @@
 import os
-from fastapi import FastAPI, HTTPException
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-import google.generativeai as genai
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI(title="MINERVA AI Service")
+logger = logging.getLogger(__name__)
+
+# Warm-up
+def start_warm_up(app: FastAPI):
+    """
+    Build clients on a worker thread; a no-op while one is already running
+    """
+    pending = getattr(app.state, "warm_up", None)
+    if pending is not None and not pending.done():
+        return pending
+
+    def run():
+        try:
+            warm_up()
+        except Exception:
+            # Readiness keeps reporting the error; the next probe retries
+            logger.exception("Warm-up failed")
+
+    app.state.warm_up = asyncio.get_running_loop().run_in_executor(None, run)
+    return app.state.warm_up
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build clients in the background so the port opens immediately;
+    /ready flips to 200 once they exist. With WARM_UP_ON_STARTUP=false the
+    first /ready probe starts the warm-up instead.
+    """
+    if os.getenv("WARM_UP_ON_STARTUP", "true").lower() != "false":
+        start_warm_up(app)
+
+    # Sentinel stream fan-out across replicas
+    if os.getenv("REDIS_URL"):
+        try:
+            broker.attach_relay(RedisRelay(os.getenv("REDIS_URL")), asyncio.get_running_loop())
+        except Exception:
+            logger.warning("Sentinel stream running without Redis relay", exc_info=True)
+    yield
+
+    # Write out complaints that were accepted but not yet scored
+    await ingest_pipeline.stop()
+
+app = FastAPI(title="MINERVA AI Service", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -20,25 +65,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-
-# Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-)
+# Gemini and Supabase clients are built lazily (see clients.py)
+from clients import get_supabase, get_query_cache, warm_up, readiness
 
 # Import services
-from sentinel import detect_outage_risk
+from sentinel import detect_outage_risk, fetch_latest_prediction
+from sentinel_stream import RedisRelay, broker
 from sentiment import analyze_sentiment_batch
 from swot import generate_swot_analysis
 from complaint_summary import generate_complaint_summary
+from ingest import ComplaintIngestPipeline, IngestReport, validate_complaint
+
+# Shared complaint ingest pipeline (workers start on first submit)
+ingest_pipeline = ComplaintIngestPipeline(
+    get_supabase,
+    on_write=lambda rows: get_query_cache().notify_write('complaints', rows)
+)
 
 # Request models
 class SentinelAnalyzeRequest(BaseModel):
     company_id: str
 
+class SentinelPublishRequest(BaseModel):
+    company_id: str
+    prediction: Optional[dict] = None
+
 class SentimentAnalyzeRequest(BaseModel):
     complaints: List[str]
     company_id: str
@@ -53,19 +104,89 @@ class ComplaintSummaryRequest(BaseModel):
 # Routes
 @app.get("/health")
 async def health_check():
+    """
+    Liveness: the process is up, no dependencies are touched
+    """
     return {"status": "ok", "service": "MINERVA AI Service"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: Gemini and Supabase clients have been built
+    """
+    state = readiness()
+    if not state["ready"]:
+        # Nothing else builds the clients when startup warm-up is disabled
+        start_warm_up(app)
+    status_code = 200 if state["ready"] else 503
+    return JSONResponse(status_code=status_code, content={"service": "MINERVA AI Service", **state})
+
+@app.post("/warmup")
+async def warm_up_clients():
+    """
+    Explicitly build all clients now (e.g. from a deploy hook)
+    """
+    try:
+        timings = await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        return {"success": True, "timings": timings}
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Query cache hit rates for this service and every service sharing Redis
+    """
+    return {"services": get_query_cache().all_service_stats()}
+
 @app.post("/sentinel/analyze")
 async def analyze_sentinel(request: SentinelAnalyzeRequest):
     """
     Analyze metrics for potential outage prediction using Sentinel algorithm
     """
     try:
-        prediction = await detect_outage_risk(request.company_id, supabase)
+        prediction = await detect_outage_risk(request.company_id, get_supabase())
         return {"success": True, "prediction": prediction}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/sentinel/stream")
+async def stream_sentinel(
+    company_id: str,
+    request: Request,
+    last_event_id: Optional[str] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Server-Sent Events stream of Sentinel predictions for one company
+    Sends a snapshot (or missed events when resuming via Last-Event-ID),
+    then every new/updated prediction, with periodic heartbeats.
+    """
+    events = broker.stream(
+        company_id,
+        lambda: fetch_latest_prediction(company_id, get_supabase()),
+        last_event_id=last_event_id_header or last_event_id,
+        is_disconnected=request.is_disconnected,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/sentinel/publish")
+async def publish_sentinel(request: SentinelPublishRequest):
+    """
+    Push an updated prediction (e.g. resolved via the gateway) to stream subscribers
+    """
+    get_query_cache().notify_write(
+        'outage_predictions',
+        request.prediction or {'company_id': request.company_id},
+        'UPDATE'
+    )
+    event_id = broker.publish(request.company_id, request.prediction)
+    return {"success": True, "event_id": event_id, "subscribers": broker.subscriber_count(request.company_id)}
+
 @app.post("/ai/sentiment")
 async def analyze_sentiment(request: SentimentAnalyzeRequest):
     """
@@ -77,13 +198,80 @@ async def analyze_sentiment(request: SentimentAnalyzeRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ai/complaints/ingest")
+async def ingest_complaints(request: Request, wait: bool = False):
+    """
+    Stream complaints as NDJSON ({"company_id", "text", "timestamp"?} per line,
+    or {"company_id", "id"} to re-score a stored complaint)
+    They are scored in micro-batches and written back to `complaints`.
+    With wait=true the response is sent once every accepted line is stored and
+    reports how many were scored, stored unscored, or failed to write.
+    """
+    report = IngestReport()
+    accepted = 0
+    rejected = 0
+    errors = []
+    line_number = 0
+    pending = b""
+
+    async def handle(line: bytes):
+        nonlocal accepted, rejected
+        if not line.strip():
+            return
+        try:
+            complaint = validate_complaint(json.loads(line))
+        except (ValueError, TypeError) as e:
+            ingest_pipeline.rejected += 1
+            rejected += 1
+            if len(errors) < 20:
+                errors.append({"line": line_number, "error": str(e)})
+            return
+        # Blocks while the pipeline is full, which stops reading the body
+        await ingest_pipeline.submit(complaint, report)
+        accepted += 1
+
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_number += 1
+            await handle(line)
+
+    if pending:
+        line_number += 1
+        await handle(pending)
+
+    if not wait:
+        return {
+            "success": True,
+            "accepted": accepted,
+            "rejected": rejected,
+            "errors": errors,
+        }
+
+    await report.wait()
+    return {
+        "success": report.write_failures == 0,
+        "accepted": accepted,
+        "rejected": rejected,
+        "errors": errors,
+        **report.as_dict(),
+    }
+
+@app.get("/ai/complaints/ingest/stats")
+async def ingest_stats():
+    """
+    Per-stage throughput counters for the complaint ingest pipeline
+    """
+    return ingest_pipeline.stats()
+
 @app.post("/ai/swot")
 async def generate_swot(request: SwotRequest):
     """
     Generate SWOT analysis using Gemini Pro
     """
     try:
-        swot = await generate_swot_analysis(request.company_id, supabase)
+        swot = await generate_swot_analysis(request.company_id, get_supabase())
         return {"success": True, "swot": swot}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -97,7 +285,7 @@ async def summarize_complaints(request: ComplaintSummaryRequest):
         summary = await generate_complaint_summary(
             request.company_id,
             request.time_range,
-            supabase
+            get_supabase()
         )
         return {"success": True, "summary": summary}
     except Exception as e:
@@ -0,0 +1,552 @@
+"""
+Two-tier read cache for Supabase queries, shared by the Python services
+
+Each service is deployed on its own, so this module is vendored into both
+backend/ai-service and backend/voice-service. Keep the copies identical
+(test_query_cache.py checks).
+
+Reads go through CachedClient.table(...) with the same builder chain as the
+supabase client (select/eq/order/limit/... then execute()). Results are
+cached in an in-process LRU and, when REDIS_URL is set, in Redis so every
+service shares them. Entries are keyed by table, filters and projection.
+
+Entries are scoped by table and company (the `company_id` filter, or
+`company_name` for brand_profiles). They are invalidated by change events
+with the shape of Supabase Realtime `postgres_changes` payloads:
+
+    {"table": "complaints", "type": "INSERT", "record": {...}, "old_record": {...}}
+
+Events come from change feeds: LocalChangeFeed (in-process; the services
+publish their own writes to it and it stands in for Realtime offline and in
+tests), RedisChangeFeed (relays those writes to the other services) and
+optionally SupabaseRealtimeFeed. A TTL bounds staleness for writes that
+produce no event.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+KEY_PREFIX = "minerva:qc"
+STATS_PUBLISH_SECONDS = 5.0
+
+# Column that scopes a table's rows to one tenant
+SCOPE_COLUMNS = {
+    'brand_profiles': 'company_name',
+}
+DEFAULT_SCOPE_COLUMN = 'company_id'
+ALL_SCOPES = '*'
+
+# Row filters are ANDed together, so their chaining order doesn't matter
+FILTER_METHODS = {'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is_', 'in_'}
+# Builder methods that only shape a read and can be part of a cache key
+READ_METHODS = FILTER_METHODS | {'select', 'order', 'limit', 'range', 'single', 'maybe_single'}
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """
+    Stand-in for the postgrest APIResponse: only `.data` is used by callers
+    """
+
+    def __init__(self, data: Any, cache: str):
+        self.data = data
+        self.cache = cache
+
+
+class LocalChangeFeed:
+    """
+    In-process change feed; same event shape as Supabase Realtime
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        self._subscribers.append(callback)
+
+    def publish(self, event: Dict[str, Any]):
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Change feed subscriber failed")
+
+
+class RedisChangeFeed(LocalChangeFeed):
+    """
+    Fans the services' own writes out to every process sharing Redis
+
+    Realtime delivers database changes to each service directly; this covers
+    writes made through the API when Realtime isn't enabled.
+    """
+
+    CHANNEL = f"{KEY_PREFIX}:changes"
+
+    def __init__(self, redis_url: str):
+        super().__init__()
+        import redis
+
+        self.origin = uuid.uuid4().hex
+        self._redis = redis.Redis.from_url(redis_url)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._listen, daemon=True)
+            self._thread.start()
+
+    def broadcast(self, event: Dict[str, Any]):
+        self._redis.publish(self.CHANNEL, json.dumps({"origin": self.origin, "event": event}, default=str))
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    payload = json.loads(message["data"])
+                    # Our own writes were already applied locally
+                    if payload.get("origin") != self.origin:
+                        self.publish(payload["event"])
+            except Exception:
+                logger.warning("Redis change feed disconnected", exc_info=True)
+                time.sleep(1)
+
+
+class SupabaseRealtimeFeed(LocalChangeFeed):
+    """
+    Relays Supabase Realtime postgres_changes for the given tables
+
+    Runs a websocket client on a daemon thread and reconnects with backoff.
+    The tables must be in the `supabase_realtime` publication (schema.sql).
+    """
+
+    HEARTBEAT_SECONDS = 25
+
+    def __init__(self, supabase_url: str, api_key: str, tables: Iterable[str]):
+        super().__init__()
+        host = supabase_url.split('://', 1)[-1].rstrip('/')
+        self.url = f"wss://{host}/realtime/v1/websocket?apikey={api_key}&vsn=1.0.0"
+        self.api_key = api_key
+        self.tables = list(tables)
+        self.connected = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True)
+            self._thread.start()
+
+    async def _run(self):
+        import websockets
+
+        backoff = 1
+        while True:
+            try:
+                async with websockets.connect(self.url) as ws:
+                    await ws.send(json.dumps({
+                        "topic": "realtime:minerva-query-cache",
+                        "event": "phx_join",
+                        "payload": {
+                            "config": {
+                                "postgres_changes": [
+                                    {"event": "*", "schema": "public", "table": t} for t in self.tables
+                                ]
+                            },
+                            "access_token": self.api_key,
+                        },
+                        "ref": "1",
+                    }))
+                    self.connected = True
+                    backoff = 1
+                    await asyncio.gather(self._heartbeat(ws), self._receive(ws))
+            except Exception:
+                logger.warning("Realtime feed disconnected", exc_info=True)
+            self.connected = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    async def _heartbeat(self, ws):
+        ref = 0
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_SECONDS)
+            ref += 1
+            await ws.send(json.dumps({"topic": "phoenix", "event": "heartbeat", "payload": {}, "ref": f"hb{ref}"}))
+
+    async def _receive(self, ws):
+        async for message in ws:
+            msg = json.loads(message)
+            if msg.get("event") != "postgres_changes":
+                continue
+            data = msg.get("payload", {}).get("data", {})
+            self.publish({
+                "table": data.get("table"),
+                "type": data.get("type"),
+                "record": data.get("record") or {},
+                "old_record": data.get("old_record") or {},
+            })
+
+
+class _TableStats:
+    def __init__(self):
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def scope_column(table: str) -> str:
+    return SCOPE_COLUMNS.get(table, DEFAULT_SCOPE_COLUMN)
+
+
+class QueryCache:
+    """
+    In-process LRU in front of an optional shared Redis tier
+    """
+
+    def __init__(
+        self,
+        service: str,
+        max_entries: int = 1024,
+        ttl_seconds: float = 30.0,
+        redis_url: Optional[str] = None,
+        feeds: Iterable[LocalChangeFeed] = (),
+    ):
+        self.service = service
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+
+        # key -> (expires_at, data, table, scope)
+        self._entries: "OrderedDict[str, Tuple[float, Any, str, str]]" = OrderedDict()
+        self._index: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.RLock()
+        self._stats: Dict[str, _TableStats] = defaultdict(_TableStats)
+        self._stats_published_at = 0.0
+
+        self._redis = None
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+                self._redis.ping()
+            except Exception:
+                logger.warning("Query cache running without Redis", exc_info=True)
+                self._redis = None
+
+        self.feeds = list(feeds)
+        for feed in self.feeds:
+            feed.subscribe(self.handle_change)
+
+    def wrap(self, supabase) -> "CachedClient":
+        return CachedClient(self, supabase)
+
+    # Keys
+
+    @staticmethod
+    def _scope(table: str, ops: List[Tuple[str, tuple, dict]]) -> str:
+        column = scope_column(table)
+        for name, args, _ in ops:
+            if name == 'eq' and len(args) == 2 and args[0] == column:
+                return str(args[1])
+        return ALL_SCOPES
+
+    @staticmethod
+    def _key(table: str, scope: str, ops: List[Tuple[str, tuple, dict]]) -> str:
+        # Filters are sorted so chaining order doesn't split the cache; the
+        # rest keep call order (repeated order() calls are sort priorities)
+        filters, shaping = [], []
+        for name, args, kwargs in ops:
+            encoded = json.dumps([name, list(args), kwargs], sort_keys=True, default=str)
+            (filters if name in FILTER_METHODS else shaping).append(encoded)
+        normalized = sorted(filters) + [""] + shaping
+        digest = hashlib.sha1("\n".join(normalized).encode()).hexdigest()
+        return f"{KEY_PREFIX}:{table}:{scope}:{digest}"
+
+    # Lookups
+
+    def get_or_fetch(self, table: str, ops: List[Tuple[str, tuple, dict]], fetch: Callable[[], Any]) -> CachedResponse:
+        scope = self._scope(table, ops)
+        key = self._key(table, scope, ops)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            hit = entry is not None and entry[0] > time.monotonic()
+            if hit:
+                self._entries.move_to_end(key)
+                self._stats[table].local_hits += 1
+            generation = self._generations[table]
+
+        if hit:
+            self._maybe_publish_stats()
+            return CachedResponse(entry[1], "local")
+
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(key)
+                if raw is not None:
+                    data = json.loads(raw)
+                    self._store_local(key, data, table, scope, generation)
+                    self._count(table, 'redis_hits')
+                    self._maybe_publish_stats()
+                    return CachedResponse(data, "redis")
+            except Exception:
+                logger.warning("Query cache Redis read failed", exc_info=True)
+
+        data = fetch().data
+        self._count(table, 'misses')
+
+        if self._store_local(key, data, table, scope, generation) and self._redis is not None:
+            try:
+                index = f"{KEY_PREFIX}:idx:{table}:{scope}"
+                pipe = self._redis.pipeline()
+                pipe.setex(key, int(self.ttl) or 1, json.dumps(data, default=str))
+                pipe.sadd(index, key)
+                pipe.expire(index, int(self.ttl * 2) or 2)
+                pipe.execute()
+            except Exception:
+                logger.warning("Query cache Redis write failed", exc_info=True)
+
+        self._maybe_publish_stats()
+        return CachedResponse(data, "miss")
+
+    def _store_local(self, key: str, data: Any, table: str, scope: str, generation: int) -> bool:
+        """
+        Cache unless the table was invalidated while the read was in flight
+        """
+        with self._lock:
+            if self._generations[table] != generation:
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, data, table, scope)
+            self._entries.move_to_end(key)
+            self._index[(table, scope)].add(key)
+            while len(self._entries) > self.max_entries:
+                old_key, (_, _, old_table, old_scope) = self._entries.popitem(last=False)
+                self._index[(old_table, old_scope)].discard(old_key)
+            return True
+
+    # Invalidation
+
+    def handle_change(self, event: Dict[str, Any]):
+        """
+        Drop cached reads a Realtime-style change event may have affected
+        """
+        table = event.get('table')
+        if not table:
+            return
+
+        column = scope_column(table)
+        scopes = set()
+        for record in (event.get('record') or {}, event.get('old_record') or {}):
+            if record.get(column) is not None:
+                scopes.add(str(record[column]))
+
+        self.invalidate(table, scopes or None)
+
+    def invalidate(self, table: str, scopes: Optional[Iterable[str]] = None):
+        """
+        Invalidate the given company scopes of a table (plus unscoped reads),
+        or the whole table when scopes is None
+        """
+        with self._lock:
+            self._generations[table] += 1
+            self._stats[table].invalidations += 1
+            if scopes is None:
+                targets = [k for k in self._index if k[0] == table]
+            else:
+                targets = [(table, s) for s in set(scopes) | {ALL_SCOPES}]
+            for target in targets:
+                for key in self._index.pop(target, ()):
+                    self._entries.pop(key, None)
+
+        if self._redis is not None:
+            try:
+                if scopes is None:
+                    indexes = list(self._redis.scan_iter(f"{KEY_PREFIX}:idx:{table}:*"))
+                else:
+                    indexes = [f"{KEY_PREFIX}:idx:{table}:{s}" for s in set(scopes) | {ALL_SCOPES}]
+                for index in indexes:
+                    keys = self._redis.smembers(index)
+                    self._redis.delete(index, *keys)
+            except Exception:
+                logger.warning("Query cache Redis invalidation failed", exc_info=True)
+
+    def notify_write(self, table: str, rows: Any, change_type: str = "INSERT"):
+        """
+        Publish our own writes: applied to this cache immediately (before
+        Realtime delivers the same change) and broadcast to other services
+        """
+        rows = rows if isinstance(rows, list) else [rows or {}]
+        local = next((f for f in self.feeds if type(f) is LocalChangeFeed), None)
+        broadcasters = [f for f in self.feeds if isinstance(f, RedisChangeFeed)]
+
+        for row in rows:
+            event = {"table": table, "type": change_type, "record": row or {}, "old_record": {}}
+            if local is not None:
+                local.publish(event)
+            else:
+                self.handle_change(event)
+            for feed in broadcasters:
+                try:
+                    feed.broadcast(event)
+                except Exception:
+                    logger.warning("Change broadcast failed", exc_info=True)
+
+    # Stats
+
+    def _count(self, table: str, counter: str):
+        # Lookups run on executor threads; += on a shared attribute isn't atomic
+        with self._lock:
+            stats = self._stats[table]
+            setattr(stats, counter, getattr(stats, counter) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tables = {t: s.snapshot() for t, s in self._stats.items()}
+            entries = len(self._entries)
+            totals = _TableStats()
+            for s in self._stats.values():
+                totals.local_hits += s.local_hits
+                totals.redis_hits += s.redis_hits
+                totals.misses += s.misses
+                totals.invalidations += s.invalidations
+        return {
+            "service": self.service,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "redis": self._redis is not None,
+            "realtime": any(getattr(f, 'connected', False) for f in self.feeds),
+            "totals": totals.snapshot(),
+            "tables": tables,
+        }
+
+    def _maybe_publish_stats(self):
+        """
+        Share this service's counters through Redis every few seconds; never
+        called with the lock held, so a slow Redis doesn't stall local hits
+        """
+        if self._redis is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._stats_published_at < STATS_PUBLISH_SECONDS:
+                return
+            self._stats_published_at = now
+        try:
+            self._redis.set(f"{KEY_PREFIX}:stats:{self.service}", json.dumps(self.stats()))
+        except Exception:
+            logger.warning("Query cache stats publish failed", exc_info=True)
+
+    def all_service_stats(self) -> Dict[str, Any]:
+        """
+        Stats of every service sharing the Redis tier (just this one without Redis)
+        """
+        services = {self.service: self.stats()}
+        if self._redis is not None:
+            try:
+                for key in self._redis.scan_iter(f"{KEY_PREFIX}:stats:*"):
+                    name = key.decode().rsplit(':', 1)[-1]
+                    if name != self.service:
+                        raw = self._redis.get(key)
+                        if raw:
+                            services[name] = json.loads(raw)
+            except Exception:
+                logger.warning("Query cache stats read failed", exc_info=True)
+        return services
+
+
+class CachedTable:
+    """
+    Records a read-only builder chain; execute() serves it from the cache
+    """
+
+    def __init__(self, cache: QueryCache, supabase, table: str):
+        self._cache = cache
+        self._supabase = supabase
+        self._table = table
+        self._ops: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if name not in READ_METHODS:
+            raise AttributeError(f"{name}() is not cacheable; use the Supabase client directly")
+
+        def record(*args, **kwargs):
+            self._ops.append((name, args, kwargs))
+            return self
+
+        return record
+
+    def _fetch(self):
+        query = self._supabase.table(self._table)
+        for name, args, kwargs in self._ops:
+            query = getattr(query, name)(*args, **kwargs)
+        return query.execute()
+
+    def execute(self) -> CachedResponse:
+        return self._cache.get_or_fetch(self._table, self._ops, self._fetch)
+
+
+class CachedClient:
+    """
+    Read-through wrapper: `.table(name)` chains like the supabase client
+    """
+
+    def __init__(self, cache: QueryCache, supabase):
+        self._cache = cache
+        self._supabase = supabase
+
+    def table(self, name: str) -> CachedTable:
+        return CachedTable(self._cache, self._supabase, name)
+
+
+def from_env(service: str, tables: Iterable[str]) -> QueryCache:
+    """
+    Build a QueryCache from QUERY_CACHE_* / REDIS_URL environment variables
+    """
+    feeds: List[LocalChangeFeed] = [LocalChangeFeed()]
+    redis_url = os.getenv("REDIS_URL") or None
+
+    if redis_url:
+        try:
+            redis_feed = RedisChangeFeed(redis_url)
+            redis_feed.start()
+            feeds.append(redis_feed)
+        except Exception:
+            logger.warning("Query cache running without Redis change feed", exc_info=True)
+
+    if os.getenv("QUERY_CACHE_REALTIME", "false").lower() == "true":
+        realtime = SupabaseRealtimeFeed(
+            os.getenv("SUPABASE_URL", ""),
+            os.getenv("SUPABASE_SERVICE_ROLE_KEY", ""),
+            tables
+        )
+        realtime.start()
+        feeds.append(realtime)
+
+    return QueryCache(
+        service,
+        max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "1024")),
+        ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", "30")),
+        redis_url=redis_url,
+        feeds=feeds,
+    )
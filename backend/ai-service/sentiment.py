@@ -4,9 +4,7 @@ Sentiment analysis using Gemini Flash (fast and cheap)
 
 import json
 from typing import List, Dict
-import google.generativeai as genai
-
-flash_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+from clients import get_model, generation_config
 
 async def analyze_sentiment_batch(complaints: List[str]) -> List[Dict]:
     """
@@ -30,12 +28,12 @@ async def analyze_sentiment_batch(complaints: List[str]) -> List[Dict]:
     Return as array of objects, one per complaint.
     """
 
-    generation_config = genai.types.GenerationConfig(
+    config = generation_config(
         response_mime_type="application/json",
         temperature=0.2
     )
 
-    response = flash_model.generate_content(prompt, generation_config=generation_config)
+    response = get_model().generate_content(prompt, generation_config=config)
     results = json.loads(response.text)
 
     return results
@@ -6,11 +6,16 @@ Uses statistical analysis + AI to predict outages 15-30 minutes before they're v
 import json
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, Any, List
-import google.generativeai as genai
+from typing import Dict, Any, List, Optional
+from clients import get_model, generation_config, get_query_cache
+from sentinel_stream import broker
 
-# Initialize Gemini Pro for predictions
-pro_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+# Detection parameters (shared with backtest.py)
+WINDOW_MINUTES = 10
+DROP_LAG_SAMPLES = 10  # happiness drop lag, in samples (not minutes)
+BASELINE_DAYS = 30
+Z_THRESHOLD = 2
+MIN_ANOMALOUS_METRICS = 2
 
 async def detect_outage_risk(company_id: str, supabase) -> Dict[str, Any]:
     """
@@ -19,7 +24,7 @@ async def detect_outage_risk(company_id: str, supabase) -> Dict[str, Any]:
     """
 
     # Step 1: Fetch recent metrics (last 10 minutes)
-    ten_min_ago = (datetime.now() - timedelta(minutes=10)).isoformat()
+    ten_min_ago = (datetime.now() - timedelta(minutes=WINDOW_MINUTES)).isoformat()
 
     recent_metrics_response = supabase.table('metrics_timeseries')\
         .select('*')\
@@ -30,7 +35,7 @@ async def detect_outage_risk(company_id: str, supabase) -> Dict[str, Any]:
     recent_metrics = recent_metrics_response.data
 
     # Step 2: Fetch historical patterns (last 30 days for baseline)
-    thirty_days_ago = (datetime.now() - timedelta(days=30)).isoformat()
+    thirty_days_ago = (datetime.now() - timedelta(days=BASELINE_DAYS)).isoformat()
 
     historical_metrics_response = supabase.table('metrics_timeseries')\
         .select('*')\
@@ -88,8 +93,27 @@ async def detect_outage_risk(company_id: str, supabase) -> Dict[str, Any]:
         'similar_incident_id': prediction.get('similar_incident_id'),
     }).execute()
 
+    # Step 9: Push to dashboards subscribed to the Sentinel stream
+    if stored_prediction.data:
+        get_query_cache().notify_write('outage_predictions', stored_prediction.data)
+        broker.publish(company_id, stored_prediction.data[0])
+
     return prediction
 
+def fetch_latest_prediction(company_id: str, supabase) -> Optional[Dict]:
+    """
+    Most recent unresolved prediction (same query as the gateway's /sentinel/status)
+    """
+    response = get_query_cache().wrap(supabase).table('outage_predictions')\
+        .select('*')\
+        .eq('company_id', company_id)\
+        .is_('resolved_at', 'null')\
+        .order('created_at', desc=True)\
+        .limit(1)\
+        .execute()
+
+    return response.data[0] if response.data else None
+
 def calculate_anomaly_scores(recent_metrics: List[Dict], historical_metrics: List[Dict], recent_complaints: List[Dict]) -> tuple:
     """
     Calculate Z-scores for key metrics to detect anomalies
@@ -100,11 +124,11 @@ def calculate_anomaly_scores(recent_metrics: List[Dict], historical_metrics: Lis
     happiness_historical = [float(m['value']) for m in historical_metrics if m['metric_type'] == 'happiness']
 
     # Calculate complaint velocity
-    complaint_velocity = len(recent_complaints) / 10.0 * 60  # Complaints per hour
+    complaint_velocity = len(recent_complaints) / float(WINDOW_MINUTES) * 60  # Complaints per hour
 
     # Historical complaint rate
     historical_complaints_response = [c for c in recent_complaints]
-    historical_complaint_rate = len(historical_complaints_response) / (30 * 24)  # Per hour over 30 days
+    historical_complaint_rate = len(historical_complaints_response) / (BASELINE_DAYS * 24)  # Per hour over 30 days
 
     # Calculate happiness drop
     happiness_drop = 0
@@ -121,8 +145,8 @@ def calculate_anomaly_scores(recent_metrics: List[Dict], historical_metrics: Lis
     # Happiness drop Z-score
     if len(happiness_historical) > 1:
         historical_drops = []
-        for i in range(len(happiness_historical) - 10):
-            drop = happiness_historical[i] - happiness_historical[i + 10]
+        for i in range(len(happiness_historical) - DROP_LAG_SAMPLES):
+            drop = happiness_historical[i] - happiness_historical[i + DROP_LAG_SAMPLES]
             historical_drops.append(drop)
 
         if len(historical_drops) > 0:
@@ -137,8 +161,8 @@ def calculate_anomaly_scores(recent_metrics: List[Dict], historical_metrics: Lis
     z_scores['sentiment'] = avg_sentiment * -10  # Negative sentiment should increase Z-score
 
     # Detect anomaly if 2+ metrics have |Z| > 2
-    anomalous_metrics = sum([abs(z) > 2 for z in z_scores.values()])
-    anomaly_detected = anomalous_metrics >= 2
+    anomalous_metrics = sum([abs(z) > Z_THRESHOLD for z in z_scores.values()])
+    anomaly_detected = anomalous_metrics >= MIN_ANOMALOUS_METRICS
 
     metrics_summary = {
         'complaint_velocity': complaint_velocity,
@@ -181,7 +205,7 @@ async def fetch_similar_incidents(keywords: List[str], company_id: str, supabase
     """
     # For simplicity, just fetch recent historical incidents
     # In production, you'd use vector similarity search
-    response = supabase.table('historical_incidents')\
+    response = get_query_cache().wrap(supabase).table('historical_incidents')\
         .select('*')\
         .eq('company_id', company_id)\
         .order('occurred_at', desc=True)\
@@ -231,12 +255,12 @@ async def generate_ai_prediction(metrics_summary: Dict, keywords: List[str], sim
     - action_plan: 3-5 specific actions to take immediately
     """
 
-    generation_config = genai.types.GenerationConfig(
+    config = generation_config(
         response_mime_type="application/json",
         temperature=0.3
     )
 
-    response = pro_model.generate_content(prompt, generation_config=generation_config)
+    response = get_model().generate_content(prompt, generation_config=config)
     prediction = json.loads(response.text)
 
     return prediction
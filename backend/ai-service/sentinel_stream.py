@@ -0,0 +1,292 @@
+"""
+MINERVA Sentinel - push-based status stream (Server-Sent Events)
+
+detect_outage_risk() publishes every stored prediction here. Each company has
+a channel with a bounded replay buffer and any number of subscribers, so
+dashboards get alerts as soon as they are written and the number of open
+viewers no longer drives database reads.
+
+Event ids are "<boot id>:<sequence>". A reconnecting client sends its last id
+(Last-Event-ID) and receives everything it missed from the replay buffer; if
+the id is from another process lifetime or already evicted, it gets a fresh
+snapshot instead.
+
+With more than one replica (or uvicorn worker), set REDIS_URL: every
+publish() is relayed through Redis pub/sub (RedisRelay) and fanned out by
+each replica to its own subscribers. Sequence numbers stay per process, so a
+client that reconnects to another replica gets a snapshot.
+
+Writers outside this process (the gateway's resolve and demo reset routes)
+push their changes through POST /sentinel/publish. Snapshots are reloaded from
+the database once they are older than SNAPSHOT_TTL_SECONDS, so a write that
+skipped the publish call is still picked up on the next (re)connect.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional, Set, Tuple
+
+HEARTBEAT_SECONDS = 15
+RETRY_MILLISECONDS = 3000
+REPLAY_BUFFER_SIZE = 100
+SUBSCRIBER_QUEUE_SIZE = 100
+# Same bound on staleness as the dashboard's former 30s polling
+SNAPSHOT_TTL_SECONDS = 30.0
+
+logger = logging.getLogger(__name__)
+
+Event = Tuple[int, str, Dict[str, Any]]
+
+
+class _Subscriber:
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        # Set when the subscriber fell too far behind; it is disconnected and
+        # resumes from the replay buffer on reconnect
+        self.overflowed = False
+
+
+class _Channel:
+    def __init__(self):
+        self.buffer: Deque[Event] = deque(maxlen=REPLAY_BUFFER_SIZE)
+        self.subscribers: Set[_Subscriber] = set()
+        self.latest: Optional[Dict[str, Any]] = None
+        self.has_latest = False
+        self.latest_at = 0.0
+        # Sequence of the last event published on this channel
+        self.sequence = 0
+        # Highest sequence that has fallen out of the replay buffer
+        self.evicted_up_to = 0
+
+
+class RedisRelay:
+    """
+    Relays publishes between replicas over Redis pub/sub
+    Same pattern as query_cache.RedisChangeFeed: a daemon thread listens and
+    skips messages this process sent itself.
+    """
+
+    CHANNEL = "minerva:sentinel:predictions"
+
+    def __init__(self, redis_url: str):
+        import redis
+
+        self.origin = uuid.uuid4().hex
+        self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+        self._listener = redis.Redis.from_url(redis_url)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, deliver: Callable[[str, Optional[Dict[str, Any]], str], None]):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._listen, args=(deliver,), daemon=True)
+            self._thread.start()
+
+    def broadcast(self, company_id: str, prediction: Optional[Dict[str, Any]], event: str):
+        self._redis.publish(self.CHANNEL, json.dumps({
+            "origin": self.origin,
+            "company_id": company_id,
+            "prediction": prediction,
+            "event": event,
+        }, default=str))
+
+    def _listen(self, deliver: Callable):
+        while True:
+            try:
+                pubsub = self._listener.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.CHANNEL)
+                for message in pubsub.listen():
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self.origin:
+                        deliver(payload["company_id"], payload.get("prediction"), payload.get("event", "prediction"))
+            except Exception:
+                logger.warning("Sentinel relay disconnected", exc_info=True)
+                time.sleep(1)
+
+
+class SentinelBroker:
+    """
+    Fan-out of Sentinel predictions, one channel per company
+    """
+
+    def __init__(self):
+        self.boot_id = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._channels: Dict[str, _Channel] = {}
+        self._relay: Optional[RedisRelay] = None
+
+    def attach_relay(self, relay: RedisRelay, loop: asyncio.AbstractEventLoop):
+        """
+        Also deliver predictions published by other replicas (and send ours)
+        """
+        self._relay = relay
+        relay.start(lambda company_id, prediction, event: loop.call_soon_threadsafe(
+            self._deliver, company_id, prediction, event
+        ))
+
+    def _channel(self, company_id: str) -> _Channel:
+        channel = self._channels.get(company_id)
+        if channel is None:
+            channel = self._channels[company_id] = _Channel()
+        return channel
+
+    def _event_id(self, sequence: int) -> str:
+        return f"{self.boot_id}:{sequence}"
+
+    def _parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """
+        Sequence number of an id issued by this process, else None
+        """
+        if not event_id:
+            return None
+        boot_id, _, sequence = event_id.partition(':')
+        if boot_id != self.boot_id or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def publish(self, company_id: str, prediction: Optional[Dict[str, Any]], event: str = "prediction") -> str:
+        """
+        Record a new/updated prediction and push it to every subscriber,
+        here and (through the relay) on every other replica
+        Must be called from the event loop thread.
+        """
+        event_id = self._deliver(company_id, prediction, event)
+        if self._relay is not None:
+            try:
+                self._relay.broadcast(company_id, prediction, event)
+            except Exception:
+                logger.warning("Sentinel relay publish failed for %s", company_id, exc_info=True)
+        return event_id
+
+    def _deliver(self, company_id: str, prediction: Optional[Dict[str, Any]], event: str) -> str:
+        """
+        Local fan-out only (event loop thread)
+        """
+        self._sequence += 1
+        channel = self._channel(company_id)
+        channel.latest = prediction
+        channel.has_latest = True
+        channel.latest_at = time.monotonic()
+        channel.sequence = self._sequence
+        if len(channel.buffer) == channel.buffer.maxlen:
+            channel.evicted_up_to = channel.buffer[0][0]
+        channel.buffer.append((self._sequence, event, {"prediction": prediction}))
+
+        for subscriber in list(channel.subscribers):
+            try:
+                subscriber.queue.put_nowait(channel.buffer[-1])
+            except asyncio.QueueFull:
+                subscriber.overflowed = True
+                channel.subscribers.discard(subscriber)
+
+        return self._event_id(self._sequence)
+
+    async def _refresh_latest(self, company_id: str, channel: _Channel, load_latest: Callable):
+        """
+        Reload the snapshot; if it changed behind our back (a database write
+        that was never published), push it to the connected subscribers too
+        """
+        sequence = channel.sequence
+        try:
+            latest = await asyncio.get_running_loop().run_in_executor(None, load_latest)
+        except Exception:
+            # Keep serving the cached snapshot (if any); the next subscriber retries
+            logger.exception("Sentinel stream snapshot failed for %s", company_id)
+            return
+
+        # A publish landed while the query was running and is newer
+        if channel.sequence != sequence:
+            return
+
+        if channel.has_latest and latest != channel.latest:
+            self.publish(company_id, latest)
+        else:
+            channel.latest = latest
+            channel.has_latest = True
+            channel.latest_at = time.monotonic()
+
+    def subscriber_count(self, company_id: Optional[str] = None) -> int:
+        if company_id is not None:
+            channel = self._channels.get(company_id)
+            return len(channel.subscribers) if channel else 0
+        return sum(len(c.subscribers) for c in self._channels.values())
+
+    def _format(self, event_id: Optional[str], event: str, data: Dict[str, Any]) -> str:
+        lines = []
+        if event_id:
+            lines.append(f"id: {event_id}")
+        lines.append(f"event: {event}")
+        lines.append(f"data: {json.dumps(data, default=str)}")
+        return "\n".join(lines) + "\n\n"
+
+    async def stream(
+        self,
+        company_id: str,
+        load_latest: Callable[[], Optional[Dict[str, Any]]],
+        last_event_id: Optional[str] = None,
+        is_disconnected: Optional[Callable] = None,
+        heartbeat_seconds: float = HEARTBEAT_SECONDS,
+        snapshot_ttl: float = SNAPSHOT_TTL_SECONDS,
+    ) -> AsyncIterator[str]:
+        """
+        SSE byte stream for one client: replay or snapshot, then live events
+        load_latest() is called for a snapshot when the cached one is missing
+        or older than snapshot_ttl.
+        """
+        channel = self._channel(company_id)
+        subscriber = _Subscriber()
+        channel.subscribers.add(subscriber)
+
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield f"retry: {RETRY_MILLISECONDS}\n\n"
+
+            resume_from = self._parse_event_id(last_event_id)
+
+            # Anything published from here on is also queued; sent_up_to
+            # lets the live loop skip what replay/snapshot already covered
+            if resume_from is not None and channel.evicted_up_to <= resume_from <= self._sequence:
+                sent_up_to = resume_from
+                for sequence, event, data in list(channel.buffer):
+                    if sequence > sent_up_to:
+                        sent_up_to = sequence
+                        yield self._format(self._event_id(sequence), event, data)
+            else:
+                if not channel.has_latest or time.monotonic() - channel.latest_at >= snapshot_ttl:
+                    await self._refresh_latest(company_id, channel, load_latest)
+                latest = channel.latest if channel.has_latest else None
+                sent_up_to = self._sequence
+                yield self._format(
+                    self._event_id(sent_up_to),
+                    "snapshot",
+                    {"prediction": latest}
+                )
+
+            while True:
+                if subscriber.overflowed:
+                    return
+                if is_disconnected is not None and await is_disconnected():
+                    return
+
+                try:
+                    sequence, event, data = await asyncio.wait_for(
+                        subscriber.queue.get(),
+                        timeout=heartbeat_seconds
+                    )
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+
+                if sequence <= sent_up_to:
+                    continue
+                sent_up_to = sequence
+                yield self._format(self._event_id(sequence), event, data)
+        finally:
+            channel.subscribers.discard(subscriber)
+
+
+broker = SentinelBroker()
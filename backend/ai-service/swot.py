@@ -4,17 +4,18 @@ SWOT Analysis generation using Gemini Pro
 
 import json
 from typing import Dict, Any
-import google.generativeai as genai
-
-pro_model = genai.GenerativeModel('gemini-2.0-flash-exp')
+from clients import get_model, generation_config, get_query_cache
 
 async def generate_swot_analysis(company_id: str, supabase) -> Dict[str, Any]:
     """
     Generate SWOT analysis based on company metrics and competitor data
     """
 
+    # Reads are shared with other services through the query cache
+    cached = get_query_cache().wrap(supabase)
+
     # Fetch company metrics
-    company_response = supabase.table('brand_profiles')\
+    company_response = cached.table('brand_profiles')\
         .select('*')\
         .eq('company_name', company_id)\
         .single()\
@@ -23,7 +24,7 @@ async def generate_swot_analysis(company_id: str, supabase) -> Dict[str, Any]:
     company_data = company_response.data if company_response.data else {}
 
     # Fetch competitor data
-    competitors_response = supabase.table('brand_profiles')\
+    competitors_response = cached.table('brand_profiles')\
         .select('*')\
         .neq('company_name', company_id)\
         .limit(3)\
@@ -32,7 +33,7 @@ async def generate_swot_analysis(company_id: str, supabase) -> Dict[str, Any]:
     competitors = competitors_response.data
 
     # Fetch recent metrics
-    recent_metrics_response = supabase.table('metrics_timeseries')\
+    recent_metrics_response = cached.table('metrics_timeseries')\
         .select('*')\
         .eq('company_id', company_id)\
         .order('timestamp', desc=True)\
@@ -46,7 +47,7 @@ async def generate_swot_analysis(company_id: str, supabase) -> Dict[str, Any]:
     avg_happiness = sum(happiness_values) / len(happiness_values) if happiness_values else 0
 
     # Fetch recent complaints for weaknesses
-    recent_complaints_response = supabase.table('complaints')\
+    recent_complaints_response = cached.table('complaints')\
         .select('*')\
         .eq('company_id', company_id)\
         .order('timestamp', desc=True)\
@@ -79,12 +80,12 @@ async def generate_swot_analysis(company_id: str, supabase) -> Dict[str, Any]:
     Make each point specific, actionable, and based on the data provided.
     """
 
-    generation_config = genai.types.GenerationConfig(
+    config = generation_config(
         response_mime_type="application/json",
         temperature=0.4
     )
 
-    response = pro_model.generate_content(prompt, generation_config=generation_config)
+    response = get_model().generate_content(prompt, generation_config=config)
     swot = json.loads(response.text)
 
     # Store in database
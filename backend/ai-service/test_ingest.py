@@ -0,0 +1,134 @@
+"""
+Tests for the complaint ingest pipeline: failure handling, re-scoring and
+per-request waits
+"""
+
+import asyncio
+
+import pytest
+
+from ingest import ComplaintIngestPipeline, IngestReport, validate_complaint
+
+
+async def _scores(texts):
+    return [{'sentiment': 'negative', 'score': -0.5, 'category': 'outage'} for _ in texts]
+
+
+def _run(score_batch, supabase, complaints):
+    async def run():
+        pipeline = ComplaintIngestPipeline(lambda: supabase, score_batch=score_batch, max_latency_ms=10)
+        report = IngestReport()
+        for complaint in complaints:
+            await pipeline.submit(complaint, report)
+        await asyncio.wait_for(report.wait(), timeout=2)
+        await pipeline.stop()
+        return pipeline, report
+
+    return asyncio.run(run())
+
+
+NEW = {'company_id': 'us', 'text': 'app is down', 'timestamp': '2024-01-01T00:00:00+00:00'}
+EXISTING = {'company_id': 'us', 'id': 7}
+STORED = {'id': 7, 'company_id': 'us', 'text': 'slow checkout', 'sentiment': None, 'sentiment_score': None, 'category': None}
+
+
+def test_scoring_error_still_inserts_new_complaints(supabase):
+    async def broken(texts):
+        raise RuntimeError("quota exceeded")
+
+    supabase.tables['complaints'].append(dict(STORED))
+    pipeline, report = _run(broken, supabase, [NEW, EXISTING])
+
+    assert supabase.requests == [('complaints', 'insert', [{**NEW, 'sentiment': None, 'sentiment_score': None, 'category': None}])]
+    assert (report.scored, report.unscored, report.stored, report.write_failures) == (0, 2, 1, 0)
+    assert report.errors == ["scoring failed: quota exceeded"]
+    assert pipeline.scoring.failures == 2
+
+
+def test_short_model_output_keeps_unscored_rows(supabase):
+    async def partial(texts):
+        return [{'sentiment': 'negative', 'score': -0.8, 'category': 'outage'}]
+
+    second = {**NEW, 'text': 'cannot log in'}
+    _, report = _run(partial, supabase, [NEW, second])
+
+    (_, _, rows), = supabase.requests
+    assert rows[0]['sentiment_score'] == -0.8
+    assert rows[1]['sentiment_score'] is None and rows[1]['text'] == 'cannot log in'
+    assert (report.scored, report.unscored, report.stored) == (1, 1, 2)
+
+
+def test_write_failures_are_reported(supabase):
+    supabase.fail = True
+    _, report = _run(_scores, supabase, [NEW])
+
+    assert (report.stored, report.write_failures) == (0, 1)
+    assert report.errors == ["write failed: database unavailable"]
+
+
+def test_rescore_updates_only_sentiment_columns(supabase):
+    supabase.tables['complaints'].append(dict(STORED))
+    scored_texts = []
+
+    async def score(texts):
+        scored_texts.extend(texts)
+        return await _scores(texts)
+
+    _, report = _run(score, supabase, [validate_complaint({'company_id': 'us', 'id': 7, 'text': 'ignored'})])
+
+    # Scored on the stored text; the write carries no text or timestamp
+    assert scored_texts == ['slow checkout']
+    (name, action, params), = supabase.requests
+    assert (name, action) == ('apply_complaint_scores', 'rpc')
+    assert params == {'scores': [{'id': 7, 'company_id': 'us', 'sentiment': 'negative', 'sentiment_score': -0.5, 'category': 'outage'}]}
+    assert supabase.tables['complaints'] == [{**STORED, 'sentiment': 'negative', 'sentiment_score': -0.5, 'category': 'outage'}]
+    assert (report.scored, report.stored) == (1, 1)
+
+
+def test_rescore_drops_unknown_and_foreign_ids(supabase):
+    supabase.tables['complaints'].append(dict(STORED))
+
+    pipeline, report = _run(_scores, supabase, [
+        {'company_id': 'competitor_a', 'id': 7},  # another tenant's complaint
+        {'company_id': 'us', 'id': 999},          # doesn't exist
+    ])
+
+    assert supabase.requests == []
+    assert supabase.tables['complaints'] == [STORED]
+    assert (report.unknown_ids, report.stored) == (2, 0)
+    assert pipeline.unknown_ids == 2
+
+
+def test_validate_requires_text_only_for_new_complaints():
+    assert validate_complaint({'company_id': 'us', 'id': '7'}) == {'company_id': 'us', 'id': 7}
+    with pytest.raises(ValueError):
+        validate_complaint({'company_id': 'us'})
+    with pytest.raises(ValueError):
+        validate_complaint({'company_id': 'us', 'id': 'seven'})
+
+
+def test_wait_returns_while_other_tenants_keep_submitting(supabase):
+    async def run():
+        pipeline = ComplaintIngestPipeline(lambda: supabase, score_batch=_scores, batch_size=5, max_latency_ms=5)
+        stop = asyncio.Event()
+
+        async def flood():
+            while not stop.is_set():
+                await pipeline.submit({**NEW, 'company_id': 'competitor_a'})
+                await asyncio.sleep(0)
+
+        producer = asyncio.create_task(flood())
+        await asyncio.sleep(0.05)
+
+        report = IngestReport()
+        await pipeline.submit(NEW, report)
+        # The shared queues never drain while the flood runs
+        await asyncio.wait_for(report.wait(), timeout=2)
+        assert report.stored == 1
+        assert pipeline.received > 1
+
+        stop.set()
+        await producer
+        await pipeline.stop()
+
+    asyncio.run(run())
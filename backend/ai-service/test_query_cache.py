@@ -0,0 +1,162 @@
+"""
+Tests for the two-tier query cache, driven by LocalChangeFeed (no Supabase
+or Realtime needed)
+"""
+
+import os
+import threading
+
+import pytest
+
+import query_cache
+from query_cache import LocalChangeFeed, QueryCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _read(client, company_id):
+    return client.table('complaints').select('*').eq('company_id', company_id).order('timestamp', desc=True).execute()
+
+
+@pytest.fixture
+def setup(supabase):
+    feed = LocalChangeFeed()
+    cache = QueryCache("test", feeds=[feed])
+    supabase.tables['complaints'] = [{'id': 1, 'company_id': 'us'}, {'id': 2, 'company_id': 'competitor_a'}]
+    return feed, cache, supabase, cache.wrap(supabase)
+
+
+def _change(company_id, table='complaints'):
+    return {"table": table, "type": "INSERT", "record": {"company_id": company_id}, "old_record": {}}
+
+
+def test_other_company_write_keeps_entry(setup):
+    feed, _, db, client = setup
+
+    assert _read(client, 'us').cache == "miss"
+    feed.publish(_change('competitor_a'))
+
+    response = _read(client, 'us')
+    assert response.cache == "local"
+    assert db.fetches == 1
+
+
+def test_same_company_write_drops_entry(setup):
+    feed, _, db, client = setup
+
+    _read(client, 'us')
+    db.tables['complaints'].append({'id': 3, 'company_id': 'us'})
+    feed.publish(_change('us'))
+
+    response = _read(client, 'us')
+    assert response.cache == "miss"
+    assert [r['id'] for r in response.data] == [1, 3]
+
+
+def test_unscoped_event_drops_whole_table(setup):
+    feed, _, _, client = setup
+
+    _read(client, 'us')
+    _read(client, 'competitor_a')
+    feed.publish({"table": "complaints", "type": "DELETE", "record": {}, "old_record": {}})
+
+    assert _read(client, 'us').cache == "miss"
+    assert _read(client, 'competitor_a').cache == "miss"
+
+
+def test_notify_write_invalidates_through_local_feed(setup):
+    _, cache, _, client = setup
+
+    _read(client, 'us')
+    cache.notify_write('complaints', [{'company_id': 'us'}])
+
+    assert _read(client, 'us').cache == "miss"
+
+
+def test_write_during_fetch_is_not_cached(setup):
+    feed, _, db, client = setup
+
+    # The change lands while the read is in flight: its result may predate it
+    db.during_fetch = lambda: feed.publish(_change('us'))
+    assert _read(client, 'us').cache == "miss"
+
+    db.during_fetch = None
+    assert _read(client, 'us').cache == "miss"
+    assert _read(client, 'us').cache == "local"
+
+
+def test_entries_expire_after_ttl(setup, monkeypatch):
+    _, cache, db, client = setup
+    now = [1000.0]
+    monkeypatch.setattr(query_cache.time, 'monotonic', lambda: now[0])
+
+    _read(client, 'us')
+    now[0] += cache.ttl - 1
+    assert _read(client, 'us').cache == "local"
+
+    now[0] += 2
+    assert _read(client, 'us').cache == "miss"
+    assert db.fetches == 2
+
+
+def test_counters_are_exact_under_concurrent_lookups(setup):
+    _, cache, _, client = setup
+    _read(client, 'us')
+
+    def hammer():
+        for _ in range(500):
+            _read(client, 'us')
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    totals = cache.stats()['totals']
+    assert (totals['local_hits'], totals['misses']) == (8 * 500, 1)
+
+
+def test_filter_order_shares_key_but_sort_order_does_not():
+    def key(*ops):
+        return QueryCache._key('complaints', 'us', [(name, args, {}) for name, *args in ops])
+
+    assert key(('eq', 'company_id', 'us'), ('gte', 'timestamp', 't')) == \
+        key(('gte', 'timestamp', 't'), ('eq', 'company_id', 'us'))
+    assert key(('order', 'a'), ('order', 'b')) != key(('order', 'b'), ('order', 'a'))
+    assert key(('limit', 5), ('eq', 'company_id', 'us')) == key(('eq', 'company_id', 'us'), ('limit', 5))
+
+
+def test_non_read_methods_are_rejected(setup):
+    _, _, _, client = setup
+
+    with pytest.raises(AttributeError):
+        client.table('complaints').insert({'text': 'x'})
+
+
+def test_redis_tier_is_shared_and_invalidated(supabase, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, 'from_url', lambda *a, **kw: fakeredis.FakeRedis(server=server))
+
+    db = supabase
+    db.tables['complaints'] = [{'id': 1, 'company_id': 'us'}]
+    ai = QueryCache("ai-service", redis_url="redis://test", feeds=[LocalChangeFeed()])
+    voice = QueryCache("voice-service", redis_url="redis://test", feeds=[LocalChangeFeed()])
+
+    assert _read(ai.wrap(db), 'us').cache == "miss"
+    assert _read(voice.wrap(db), 'us').cache == "redis"
+
+    ai.notify_write('complaints', {'company_id': 'us'})
+    assert _read(ai.wrap(db), 'us').cache == "miss"
+
+
+def test_vendored_copies_match():
+    voice_copy = os.path.join(HERE, '..', 'voice-service', 'query_cache.py')
+    if not os.path.exists(voice_copy):
+        pytest.skip("voice-service not in this checkout")
+
+    with open(os.path.join(HERE, 'query_cache.py')) as ours, open(voice_copy) as theirs:
+        assert ours.read() == theirs.read(), "update both copies of query_cache.py"
@@ -0,0 +1,247 @@
+"""
+Tests for the Sentinel SSE broker: snapshots, resume, fan-out, heartbeats,
+overflow and the cross-replica relay
+"""
+
+import asyncio
+import json
+
+import pytest
+
+import sentinel_stream
+from sentinel_stream import RedisRelay, SentinelBroker
+
+
+async def _snapshot(broker, company_id, load_latest, **kwargs):
+    events = broker.stream(company_id, load_latest, **kwargs)
+    try:
+        await events.__anext__()  # retry hint
+        frame = await events.__anext__()
+    finally:
+        await events.aclose()
+    data = frame.split("data: ", 1)[1]
+    return json.loads(data)["prediction"]
+
+
+def test_fresh_snapshot_is_served_from_memory():
+    async def run():
+        broker = SentinelBroker()
+        calls = []
+
+        def load():
+            calls.append(1)
+            return {"id": 1}
+
+        assert await _snapshot(broker, "us", load) == {"id": 1}
+        assert await _snapshot(broker, "us", load) == {"id": 1}
+        assert len(calls) == 1
+
+    asyncio.run(run())
+
+
+def test_stale_snapshot_picks_up_unpublished_write():
+    async def run():
+        broker = SentinelBroker()
+        db = {"latest": {"id": 1}}
+
+        assert await _snapshot(broker, "us", lambda: db["latest"]) == {"id": 1}
+
+        # Resolved directly in the database, no publish
+        db["latest"] = None
+        assert await _snapshot(broker, "us", lambda: db["latest"], snapshot_ttl=0) is None
+
+    asyncio.run(run())
+
+
+def test_refreshed_snapshot_is_pushed_to_live_subscribers():
+    async def run():
+        broker = SentinelBroker()
+        db = {"latest": {"id": 1}}
+
+        live = broker.stream("us", lambda: db["latest"])
+        await live.__anext__()
+        await live.__anext__()
+        pending = asyncio.create_task(live.__anext__())
+        await asyncio.sleep(0)
+
+        db["latest"] = {"id": 2}
+        assert await _snapshot(broker, "us", lambda: db["latest"], snapshot_ttl=0) == {"id": 2}
+
+        frame = await asyncio.wait_for(pending, timeout=1)
+        assert "event: prediction" in frame
+        assert json.loads(frame.split("data: ", 1)[1])["prediction"] == {"id": 2}
+        await live.aclose()
+
+    asyncio.run(run())
+
+
+def test_publish_during_snapshot_query_wins():
+    async def run():
+        broker = SentinelBroker()
+
+        def slow_load():
+            # Published while the query is in flight: the stale row must not overwrite it
+            asyncio.run_coroutine_threadsafe(publish(), loop).result()
+            return {"id": "stale"}
+
+        async def publish():
+            broker.publish("us", {"id": "new"})
+
+        loop = asyncio.get_running_loop()
+        assert await _snapshot(broker, "us", slow_load) == {"id": "new"}
+
+    asyncio.run(run())
+
+
+async def _frames(events, count):
+    return [await asyncio.wait_for(events.__anext__(), timeout=1) for _ in range(count)]
+
+
+def _event(frame):
+    fields = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return fields.get("id"), fields["event"], json.loads(fields["data"])["prediction"]
+
+
+def test_fan_out_to_every_subscriber():
+    async def run():
+        broker = SentinelBroker()
+        streams = [broker.stream("us", lambda: None) for _ in range(3)]
+        for events in streams:
+            await _frames(events, 2)  # retry hint + snapshot
+        other = broker.stream("competitor_a", lambda: None)
+        await _frames(other, 2)
+        assert broker.subscriber_count("us") == 3
+
+        event_id = broker.publish("us", {"id": 1})
+
+        for events in streams:
+            (frame,) = await _frames(events, 1)
+            assert _event(frame) == (event_id, "prediction", {"id": 1})
+            await events.aclose()
+
+        # Other companies' subscribers get nothing
+        pending = asyncio.ensure_future(other.__anext__())
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(run())
+
+
+def test_resume_replays_missed_events():
+    async def run():
+        broker = SentinelBroker()
+        first = broker.publish("us", {"id": 1})
+        second = broker.publish("us", {"id": 2})
+        third = broker.publish("us", {"id": 3})
+
+        events = broker.stream("us", lambda: {"id": "db"}, last_event_id=first)
+        _, *replayed = await _frames(events, 3)
+        assert [_event(f) for f in replayed] == [
+            (second, "prediction", {"id": 2}),
+            (third, "prediction", {"id": 3}),
+        ]
+
+        # Then live events, without repeating the replayed ones
+        fourth = broker.publish("us", {"id": 4})
+        (frame,) = await _frames(events, 1)
+        assert _event(frame) == (fourth, "prediction", {"id": 4})
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_resume_from_evicted_id_gets_snapshot(monkeypatch):
+    async def run():
+        broker = SentinelBroker()
+        monkeypatch.setattr(sentinel_stream, "REPLAY_BUFFER_SIZE", 2)
+        first = broker.publish("us", {"id": 1})
+        for i in range(2, 5):
+            last = broker.publish("us", {"id": i})
+
+        events = broker.stream("us", lambda: {"id": "db"}, last_event_id=first)
+        _, frame = await _frames(events, 2)
+        assert _event(frame) == (last, "snapshot", {"id": 4})
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_resume_from_other_boot_gets_snapshot():
+    async def run():
+        broker = SentinelBroker()
+        broker.publish("us", {"id": 1})
+
+        events = broker.stream("us", lambda: {"id": "db"}, last_event_id="0ther000:1")
+        _, frame = await _frames(events, 2)
+        assert _event(frame)[1:] == ("snapshot", {"id": 1})
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_idle_stream_sends_heartbeats():
+    async def run():
+        broker = SentinelBroker()
+        events = broker.stream("us", lambda: None, heartbeat_seconds=0.01)
+        retry, _, heartbeat = await _frames(events, 3)
+        assert retry == f"retry: {sentinel_stream.RETRY_MILLISECONDS}\n\n"
+        assert heartbeat == ": heartbeat\n\n"
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_overflowed_subscriber_is_dropped_without_draining():
+    async def run():
+        broker = SentinelBroker()
+        events = broker.stream("us", lambda: None)
+        _, snapshot = await _frames(events, 2)
+        last_seen = _event(snapshot)[0]
+
+        # One more than the queue holds: the subscriber is cut off
+        for i in range(sentinel_stream.SUBSCRIBER_QUEUE_SIZE + 1):
+            broker.publish("us", {"id": i})
+        assert broker.subscriber_count("us") == 0
+
+        # Deliberately none of the queued events are sent; the client
+        # reconnects and catches up from the replay buffer or a snapshot
+        with pytest.raises(StopAsyncIteration):
+            await events.__anext__()
+
+        # Its resume point fell out of the replay buffer, so it gets a snapshot
+        resumed = broker.stream("us", lambda: None, last_event_id=last_seen)
+        _, frame = await _frames(resumed, 2)
+        assert _event(frame)[1:] == ("snapshot", {"id": sentinel_stream.SUBSCRIBER_QUEUE_SIZE})
+        await resumed.aclose()
+
+    asyncio.run(run())
+
+
+def test_redis_relay_reaches_other_replicas(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    import redis
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.Redis, "from_url", lambda *a, **kw: fakeredis.FakeRedis(server=server))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        replica_a, replica_b = SentinelBroker(), SentinelBroker()
+        replica_a.attach_relay(RedisRelay("redis://test"), loop)
+        replica_b.attach_relay(RedisRelay("redis://test"), loop)
+
+        events = replica_b.stream("us", lambda: None)
+        await _frames(events, 2)
+        await asyncio.sleep(0.2)  # relay listeners subscribed
+
+        replica_a.publish("us", {"id": 1})
+        (frame,) = await _frames(events, 1)
+        event_id, event, prediction = _event(frame)
+        assert (event, prediction) == ("prediction", {"id": 1})
+        assert event_id.startswith(replica_b.boot_id)
+        await events.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,125 @@
+"""
+Startup benchmark for the Python services
+
+Measures, per service:
+- import time of main.py in a fresh interpreter (median of --runs)
+- time from process spawn to the first successful /health response
+- time from process spawn to /ready returning 200 (needs real credentials)
+
+Usage:
+    python bench_startup.py [--runs 5] [--services ai-service voice-service]
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import(service_dir: str) -> float:
+    """
+    Seconds spent importing main.py in a fresh interpreter
+    """
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=service_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(output.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url: str, deadline: float):
+    """
+    Poll url until it returns 200; seconds since start or None on timeout
+    """
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def measure_first_request(service_dir: str, timeout: float) -> dict:
+    """
+    Spawn uvicorn and time the first /health and /ready 200 responses
+    """
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=service_dir,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        base = f"http://127.0.0.1:{port}"
+        healthy_at = wait_for(f"{base}/health", start + timeout)
+        ready_at = wait_for(f"{base}/ready", start + timeout) if healthy_at else None
+    finally:
+        process.terminate()
+        process.wait()
+
+    return {
+        "first_health_s": round(healthy_at - start, 3) if healthy_at else None,
+        "first_ready_s": round(ready_at - start, 3) if ready_at else None,
+    }
+
+
+def bench_service(service: str, runs: int, timeout: float) -> dict:
+    service_dir = os.path.join(BACKEND_DIR, service)
+
+    import_times = [measure_import(service_dir) for _ in range(runs)]
+    requests = [measure_first_request(service_dir, timeout) for _ in range(runs)]
+
+    def median(key):
+        values = [r[key] for r in requests if r[key] is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    return {
+        "service": service,
+        "runs": runs,
+        "import_s": round(statistics.median(import_times), 3),
+        "first_health_s": median("first_health_s"),
+        "first_ready_s": median("first_ready_s"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=15.0)
+    parser.add_argument("--services", nargs="+", default=["ai-service", "voice-service"])
+    args = parser.parse_args()
+
+    results = [bench_service(s, args.runs, args.timeout) for s in args.services]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -87,4 +87,33 @@ router.post('/complaint-summary', async (req, res) => {
   }
 })
 
+// Streaming complaint ingest (NDJSON body is piped through, not buffered)
+router.post('/complaints/ingest', async (req, res) => {
+  try {
+    const response = await axios.post(`${AI_SERVICE_URL}/ai/complaints/ingest`, req, {
+      params: { wait: req.query.wait },
+      headers: { 'Content-Type': 'application/x-ndjson' },
+      maxBodyLength: Infinity,
+      timeout: 0,
+    })
+
+    res.json(response.data)
+  } catch (error) {
+    console.error('Error ingesting complaints:', error)
+    res.status(500).json({ error: error.message })
+  }
+})
+
+// Complaint ingest throughput
+router.get('/complaints/ingest/stats', async (req, res) => {
+  try {
+    const response = await axios.get(`${AI_SERVICE_URL}/ai/complaints/ingest/stats`)
+
+    res.json(response.data)
+  } catch (error) {
+    console.error('Error fetching ingest stats:', error)
+    res.status(500).json({ error: error.message })
+  }
+})
+
 module.exports = router
@@ -134,6 +134,11 @@ router.post('/reset', async (req, res) => {
       .eq('company_id', company_id)
       .is('resolved_at', null)
 
+    // Clear the alert on dashboards subscribed to the Sentinel stream (best effort)
+    await axios
+      .post(`${AI_SERVICE_URL}/sentinel/publish`, { company_id, prediction: null })
+      .catch((err) => console.error('Error publishing demo reset:', err.message))
+
     res.json({ success: true, message: 'Demo data reset successfully' })
   } catch (error) {
     console.error('Error resetting demo data:', error)
@@ -34,6 +34,45 @@ router.get('/status', async (req, res) => {
   }
 })
 
+// Live sentinel status (Server-Sent Events proxied from the AI service)
+router.get('/stream', async (req, res) => {
+  const { company_id } = req.query
+
+  if (!company_id) {
+    return res.status(400).json({ error: 'company_id is required' })
+  }
+
+  const controller = new AbortController()
+  req.on('close', () => controller.abort())
+
+  try {
+    const headers = {}
+    const lastEventId = req.get('Last-Event-ID') || req.query.last_event_id
+    if (lastEventId) headers['Last-Event-ID'] = lastEventId
+
+    const upstream = await axios.get(`${AI_SERVICE_URL}/sentinel/stream`, {
+      params: { company_id },
+      headers,
+      responseType: 'stream',
+      signal: controller.signal,
+      timeout: 0,
+    })
+
+    res.writeHead(200, {
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      Connection: 'keep-alive',
+      'X-Accel-Buffering': 'no',
+    })
+    upstream.data.pipe(res)
+    upstream.data.on('error', () => res.end())
+  } catch (error) {
+    if (controller.signal.aborted) return
+    console.error('Error opening sentinel stream:', error)
+    res.status(502).json({ error: error.message })
+  }
+})
+
 // Get recent predictions
 router.get('/predictions', async (req, res) => {
   try {
@@ -97,6 +136,16 @@ router.put('/predictions/:id/resolve', async (req, res) => {
 
     if (error) throw error
 
+    // Let stream subscribers know the prediction was resolved (best effort)
+    if (data[0]) {
+      axios
+        .post(`${AI_SERVICE_URL}/sentinel/publish`, {
+          company_id: data[0].company_id,
+          prediction: data[0],
+        })
+        .catch((err) => console.error('Error publishing resolved prediction:', err.message))
+    }
+
     res.json({ prediction: data[0] })
   } catch (error) {
     console.error('Error resolving prediction:', error)
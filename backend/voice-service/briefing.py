@@ -0,0 +1,203 @@
+"""
+Daily briefing audio assembled from cached phrase segments
+
+The briefing is a fixed template with a few variable slots (company name,
+happiness index, complaint count). Each segment is synthesized once per
+(voice, model, text) and cached in memory and in Supabase Storage; a briefing
+is the frame-level concatenation of its segments (see mp3.py), so generating
+briefings for many companies is mostly cache hits instead of full TTS calls.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import mp3
+from clients import DEFAULT_VOICE, DEFAULT_TTS_MODEL
+
+SEGMENT_CACHE_SIZE = int(os.getenv("BRIEFING_SEGMENT_CACHE_SIZE", "512"))
+SEGMENT_STORAGE_PREFIX = "segments"
+
+logger = logging.getLogger(__name__)
+
+# Fixed phrases are plain strings; variable slots are format strings
+BRIEFING_TEMPLATE = [
+    "Good morning. Here's your MINERVA daily briefing for",
+    "{company_id}.",
+    "Your current happiness index is",
+    "{avg_happiness:.1f} percent.",
+    "In the last 24 hours, we received",
+    "{recent_complaints} customer complaints.",
+    "Sentinel monitoring is active and no critical issues detected.",
+    "Have a productive day.",
+]
+
+
+def _is_not_found(error: Exception) -> bool:
+    """
+    Whether a Storage download failed only because the object doesn't exist
+    (storage3 raises StorageException with the API's error body)
+    """
+    detail = error.args[0] if error.args and isinstance(error.args[0], dict) else {}
+    message = f"{detail.get('error', '')} {detail.get('message', '')}".lower()
+    return str(detail.get('statusCode')) == '404' or 'not found' in message or 'not_found' in message
+
+
+def render_segments(**values) -> List[str]:
+    """
+    Template segments with the variable slots filled in
+    """
+    return [segment.format(**values) for segment in BRIEFING_TEMPLATE]
+
+
+def render_text(segments: List[str]) -> str:
+    """
+    Readable briefing text (sentence breaks after fixed sentences)
+    """
+    text = ""
+    for segment in segments:
+        if text:
+            text += "\n\n" if text.endswith(".") else " "
+        text += segment
+    return text
+
+
+class SegmentCache:
+    """
+    Two-level cache of synthesized segments: in-process LRU, then Storage
+    """
+
+    def __init__(self, synthesize: Callable, get_supabase: Optional[Callable] = None,
+                 max_entries: int = SEGMENT_CACHE_SIZE, bucket: str = 'audio'):
+        self._synthesize = synthesize
+        self._get_supabase = get_supabase
+        self._bucket = bucket
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.storage_hits = 0
+        self.misses = 0
+        # Requests that waited on another request's fetch (not cache hits)
+        self.shared_fetches = 0
+
+    @staticmethod
+    def key(text: str, voice: str, model: str) -> str:
+        return hashlib.sha256(f"{voice}\0{model}\0{text.strip()}".encode()).hexdigest()
+
+    def _storage_path(self, key: str) -> str:
+        return f"{SEGMENT_STORAGE_PREFIX}/{key}.mp3"
+
+    def _remember(self, key: str, audio: bytes):
+        with self._lock:
+            self._entries[key] = audio
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is not None:
+                self._entries.move_to_end(key)
+            return audio
+
+    def _load_or_synthesize(self, key: str, text: str, voice: str, model: str) -> Tuple[bytes, str]:
+        """
+        Blocking slow path: Storage, then TTS (result written back to Storage)
+        """
+        storage = self._get_supabase().storage.from_(self._bucket) if self._get_supabase else None
+
+        if storage is not None:
+            try:
+                audio = storage.download(self._storage_path(key))
+                if audio:
+                    return audio, "storage"
+            except Exception as e:
+                # A miss is expected; anything else (auth, network) is worth
+                # knowing about before it turns into a paid TTS call
+                if not _is_not_found(e):
+                    logger.warning("Segment download failed for %s, synthesizing", key, exc_info=True)
+
+        audio = self._synthesize(text.strip(), voice=voice, model=model)
+
+        if storage is not None:
+            try:
+                storage.upload(self._storage_path(key), audio, file_options={"content-type": "audio/mpeg"})
+            except Exception as e:
+                # Already uploaded by another replica, or Storage unavailable
+                logger.warning("Segment upload skipped for %s: %s", key, e)
+
+        return audio, "tts"
+
+    async def fetch(self, text: str, voice: str = DEFAULT_VOICE, model: str = DEFAULT_TTS_MODEL) -> Tuple[bytes, str]:
+        """
+        Audio for one segment and where it came from: memory, storage, tts,
+        or shared (joined another request's in-flight fetch)
+        Concurrent requests for the same segment share one fetch.
+        """
+        key = self.key(text, voice, model)
+
+        audio = self._lookup(key)
+        if audio is not None:
+            self.hits += 1
+            return audio, "memory"
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.shared_fetches += 1
+            audio, _ = await asyncio.shield(pending)
+            return audio, "shared"
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(None, self._load_or_synthesize, key, text, voice, model)
+        self._inflight[key] = future
+        try:
+            audio, source = await future
+        finally:
+            self._inflight.pop(key, None)
+
+        if source == "storage":
+            self.storage_hits += 1
+        else:
+            self.misses += 1
+        self._remember(key, audio)
+        return audio, source
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.storage_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "storage_hits": self.storage_hits,
+            "misses": self.misses,
+            "shared_fetches": self.shared_fetches,
+            "hit_rate": round((self.hits + self.storage_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+async def render_briefing(cache: SegmentCache, voice: str = DEFAULT_VOICE, **values) -> Dict[str, Any]:
+    """
+    Synthesize (or reuse) every segment concurrently and stitch the MP3 frames
+    Returns {"audio", "text", "duration", "segments", "synthesized"}.
+    """
+    segments = render_segments(**values)
+
+    fetched = await asyncio.gather(*[cache.fetch(s, voice=voice) for s in segments])
+    audio, duration = mp3.concat([a for a, _ in fetched])
+
+    return {
+        "audio": audio,
+        "text": render_text(segments),
+        "duration": duration,
+        "segments": len(segments),
+        "synthesized": sum(1 for _, source in fetched if source == "tts"),
+    }
@@ -0,0 +1,134 @@
+"""
+Lazily constructed, shared clients for the voice service (ElevenLabs + Supabase)
+
+Nothing here touches the network or credentials at import time. The first
+caller of get_supabase() / synthesize() pays the construction cost, or
+warm_up() can be called up front (main.py does so on startup).
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_VOICE = "Rachel"
+DEFAULT_TTS_MODEL = "eleven_turbo_v2"
+
+# Tables read through the shared query cache (invalidated by change events)
+CACHED_TABLES = ['metrics_timeseries', 'complaints']
+
+_lock = threading.RLock()
+_generate = None
+_supabase = None
+_query_cache = None
+_warm_up_error: Optional[str] = None
+
+
+def _elevenlabs_generate():
+    """
+    Import elevenlabs and set the API key once
+    """
+    global _generate
+
+    if _generate is None:
+        with _lock:
+            if _generate is None:
+                from elevenlabs import generate, set_api_key
+                set_api_key(os.getenv("ELEVENLABS_API_KEY"))
+                _generate = generate
+
+    return _generate
+
+
+def synthesize(text: str, voice: str = DEFAULT_VOICE, model: str = DEFAULT_TTS_MODEL) -> bytes:
+    """
+    Text to MP3 bytes via ElevenLabs
+    """
+    audio = _elevenlabs_generate()(
+        text=text,
+        voice=voice,
+        model=model
+    )
+
+    return audio if isinstance(audio, bytes) else b''.join(audio)
+
+
+def get_supabase():
+    """
+    Shared Supabase client, created on first use
+    """
+    global _supabase
+
+    if _supabase is None:
+        with _lock:
+            if _supabase is None:
+                from supabase import create_client
+                _supabase = create_client(
+                    os.getenv("SUPABASE_URL"),
+                    os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+                )
+
+    return _supabase
+
+
+def get_query_cache():
+    """
+    Shared two-tier read cache (see query_cache.py)
+    """
+    global _query_cache
+
+    if _query_cache is None:
+        with _lock:
+            if _query_cache is None:
+                from query_cache import from_env
+                _query_cache = from_env("voice-service", CACHED_TABLES)
+
+    return _query_cache
+
+
+def cached_supabase():
+    """
+    Read-through view of the Supabase client for cacheable queries
+    """
+    return get_query_cache().wrap(get_supabase())
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Eagerly build every client so the first request doesn't pay for it
+    Returns per-client construction time in milliseconds
+    """
+    global _warm_up_error
+
+    timings = {}
+    try:
+        start = time.perf_counter()
+        get_supabase()
+        timings['supabase_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        get_query_cache()
+        timings['query_cache_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        _elevenlabs_generate()
+        timings['elevenlabs_ms'] = round((time.perf_counter() - start) * 1000, 1)
+
+        _warm_up_error = None
+    except Exception as e:
+        _warm_up_error = str(e)
+        raise
+
+    return timings
+
+
+def readiness() -> Dict[str, Any]:
+    """
+    Report which clients have been built (cheap, never constructs anything)
+    """
+    return {
+        "ready": _supabase is not None and _generate is not None,
+        "supabase": _supabase is not None,
+        "elevenlabs": _generate is not None,
+        "error": _warm_up_error,
+    }
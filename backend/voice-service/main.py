@@ -1,15 +1,49 @@
 import os
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from elevenlabs import generate, set_api_key
-from supabase import create_client, Client
 from dotenv import load_dotenv
 from datetime import datetime
 
 load_dotenv()
 
-app = FastAPI(title="MINERVA Voice Service")
+logger = logging.getLogger(__name__)
+
+# Warm-up
+def start_warm_up(app: FastAPI):
+    """
+    Build clients on a worker thread; a no-op while one is already running
+    """
+    pending = getattr(app.state, "warm_up", None)
+    if pending is not None and not pending.done():
+        return pending
+
+    def run():
+        try:
+            warm_up()
+        except Exception:
+            # Readiness keeps reporting the error; the next probe retries
+            logger.exception("Warm-up failed")
+
+    app.state.warm_up = asyncio.get_running_loop().run_in_executor(None, run)
+    return app.state.warm_up
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Build clients in the background so the port opens immediately;
+    /ready flips to 200 once they exist. With WARM_UP_ON_STARTUP=false the
+    first /ready probe starts the warm-up instead.
+    """
+    if os.getenv("WARM_UP_ON_STARTUP", "true").lower() != "false":
+        start_warm_up(app)
+    yield
+
+app = FastAPI(title="MINERVA Voice Service", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -20,14 +54,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ElevenLabs API key
-set_api_key(os.getenv("ELEVENLABS_API_KEY"))
+# ElevenLabs and Supabase clients are built lazily (see clients.py)
+from clients import get_supabase, cached_supabase, get_query_cache, synthesize, warm_up, readiness
+from briefing import SegmentCache, render_briefing, render_segments, render_text
 
-# Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL"),
-    os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-)
+# Synthesized briefing phrases, shared across companies and days
+segment_cache = SegmentCache(synthesize, get_supabase)
 
 # Request models
 class TextToSpeechRequest(BaseModel):
@@ -41,8 +73,34 @@ class VoiceAlertRequest(BaseModel):
 # Routes
 @app.get("/health")
 async def health_check():
+    """
+    Liveness: the process is up, no dependencies are touched
+    """
     return {"status": "ok", "service": "MINERVA Voice Service"}
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: ElevenLabs and Supabase clients have been built
+    """
+    state = readiness()
+    if not state["ready"]:
+        # Nothing else builds the clients when startup warm-up is disabled
+        start_warm_up(app)
+    status_code = 200 if state["ready"] else 503
+    return JSONResponse(status_code=status_code, content={"service": "MINERVA Voice Service", **state})
+
+@app.post("/warmup")
+async def warm_up_clients():
+    """
+    Explicitly build all clients now (e.g. from a deploy hook)
+    """
+    try:
+        timings = await asyncio.get_running_loop().run_in_executor(None, warm_up)
+        return {"success": True, "timings": timings}
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
 @app.post("/voice/text-to-speech")
 async def text_to_speech(request: TextToSpeechRequest):
     """
@@ -50,26 +108,19 @@ async def text_to_speech(request: TextToSpeechRequest):
     """
     try:
         # Generate audio
-        audio = generate(
-            text=request.text,
-            voice=request.voice,
-            model="eleven_turbo_v2"
-        )
-
-        # Convert to bytes
-        audio_bytes = audio if isinstance(audio, bytes) else b''.join(audio)
+        audio_bytes = synthesize(request.text, voice=request.voice)
 
         # Upload to Supabase Storage
         file_path = f"tts/tts-{datetime.now().isoformat()}.mp3"
 
-        supabase.storage.from_('audio').upload(
+        get_supabase().storage.from_('audio').upload(
             file_path,
             audio_bytes,
             file_options={"content-type": "audio/mpeg"}
         )
 
         # Get public URL
-        public_url = supabase.storage.from_('audio').get_public_url(file_path)
+        public_url = get_supabase().storage.from_('audio').get_public_url(file_path)
 
         return {
             "success": True,
@@ -87,26 +138,19 @@ async def generate_voice_alert(request: VoiceAlertRequest):
     """
     try:
         # Generate audio with urgent tone
-        audio = generate(
-            text=request.alert_text,
-            voice="Rachel",
-            model="eleven_turbo_v2"
-        )
-
-        # Convert to bytes
-        audio_bytes = audio if isinstance(audio, bytes) else b''.join(audio)
+        audio_bytes = synthesize(request.alert_text, voice="Rachel")
 
         # Upload to Supabase Storage
         file_path = f"alerts/alert-{request.prediction_id}-{datetime.now().isoformat()}.mp3"
 
-        supabase.storage.from_('audio').upload(
+        get_supabase().storage.from_('audio').upload(
             file_path,
             audio_bytes,
             file_options={"content-type": "audio/mpeg"}
         )
 
         # Get public URL
-        public_url = supabase.storage.from_('audio').get_public_url(file_path)
+        public_url = get_supabase().storage.from_('audio').get_public_url(file_path)
 
         return {
             "success": True,
@@ -124,7 +168,7 @@ async def generate_daily_briefing(company_id: str):
     """
     try:
         # Fetch metrics summary
-        metrics_response = supabase.table('metrics_timeseries')\
+        metrics_response = cached_supabase().table('metrics_timeseries')\
             .select('*')\
             .eq('company_id', company_id)\
             .order('timestamp', desc=True)\
@@ -137,60 +181,79 @@ async def generate_daily_briefing(company_id: str):
         happiness_values = [float(m['value']) for m in metrics if m['metric_type'] == 'happiness']
         avg_happiness = sum(happiness_values) / len(happiness_values) if happiness_values else 0
 
-        # Fetch recent complaints
-        complaints_response = supabase.table('complaints')\
+        # Fetch recent complaints (same read as the SWOT analysis, so it's shared)
+        complaints_response = cached_supabase().table('complaints')\
             .select('*')\
             .eq('company_id', company_id)\
             .order('timestamp', desc=True)\
-            .limit(24)\
+            .limit(50)\
             .execute()
 
-        recent_complaints = len(complaints_response.data)
-
-        # Generate briefing text
-        briefing_text = f"""
-        Good morning. Here's your MINERVA daily briefing for {company_id}.
-
-        Your current happiness index is {avg_happiness:.1f} percent.
-        In the last 24 hours, we received {recent_complaints} customer complaints.
-
-        Sentinel monitoring is active and no critical issues detected.
-
-        Have a productive day.
-        """
-
-        # Generate audio
-        audio = generate(
-            text=briefing_text,
-            voice="Rachel",
-            model="eleven_turbo_v2"
-        )
-
-        # Convert to bytes
-        audio_bytes = audio if isinstance(audio, bytes) else b''.join(audio)
+        recent_complaints = len(complaints_response.data[:24])
+
+        # Assemble audio from cached phrase segments; only new values hit TTS
+        try:
+            briefing = await render_briefing(
+                segment_cache,
+                voice="Rachel",
+                company_id=company_id,
+                avg_happiness=avg_happiness,
+                recent_complaints=recent_complaints
+            )
+            briefing_text = briefing["text"]
+            audio_bytes = briefing["audio"]
+            duration = briefing["duration"]
+            synthesized = briefing["synthesized"]
+        except ValueError:
+            # Segments couldn't be stitched; fall back to one full synthesis
+            logger.warning("Segmented briefing failed, synthesizing full text", exc_info=True)
+            briefing_text = render_text(render_segments(
+                company_id=company_id,
+                avg_happiness=avg_happiness,
+                recent_complaints=recent_complaints
+            ))
+            audio_bytes = synthesize(briefing_text, voice="Rachel")
+            duration = len(audio_bytes) / 16000
+            synthesized = 1
 
         # Upload to Supabase Storage
         file_path = f"briefings/briefing-{company_id}-{datetime.now().date()}.mp3"
 
-        supabase.storage.from_('audio').upload(
+        # Regenerating is cheap now, so replace today's briefing if it exists
+        get_supabase().storage.from_('audio').upload(
             file_path,
             audio_bytes,
-            file_options={"content-type": "audio/mpeg"}
+            file_options={"content-type": "audio/mpeg", "x-upsert": "true"}
         )
 
         # Get public URL
-        public_url = supabase.storage.from_('audio').get_public_url(file_path)
+        public_url = get_supabase().storage.from_('audio').get_public_url(file_path)
 
         return {
             "success": True,
             "audio_url": public_url,
-            "text": briefing_text.strip(),
-            "duration": len(audio_bytes) / 16000
+            "text": briefing_text,
+            "duration": duration,
+            "segments_synthesized": synthesized
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """
+    Query cache hit rates for this service and every service sharing Redis
+    """
+    return {"services": get_query_cache().all_service_stats()}
+
+@app.get("/voice/briefing/cache")
+async def briefing_cache_stats():
+    """
+    Hit rate of the briefing phrase segment cache
+    """
+    return segment_cache.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
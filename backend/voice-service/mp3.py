@@ -0,0 +1,123 @@
+"""
+Minimal MPEG Layer III frame handling for stitching MP3 segments
+
+Segments are joined at frame boundaries without decoding or re-encoding:
+ID3 tags and the Xing/Info/VBRI header frame of every segment are dropped
+(their frame counts would be wrong for the combined file) and the remaining
+audio frames are concatenated. All segments must share one sample rate and
+channel mode, which holds for audio from the same TTS voice/model/format.
+"""
+
+from typing import List, NamedTuple, Tuple
+
+# Layer III bitrates (kbps) by bitrate index
+_BITRATES_V1 = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320]
+_BITRATES_V2 = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160]
+
+# Sample rates by MPEG version bits (0 = 2.5, 2 = 2, 3 = 1)
+_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+
+class FrameInfo(NamedTuple):
+    sample_rate: int
+    channel_mode: int
+    samples: int
+    length: int
+
+
+def _parse_header(data: bytes, offset: int) -> FrameInfo:
+    """
+    Decode the 4-byte frame header at offset; raises ValueError if invalid
+    """
+    if offset + 4 > len(data):
+        raise ValueError("truncated frame header")
+
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or (b1 & 0xE0) != 0xE0:
+        raise ValueError(f"no frame sync at byte {offset}")
+
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = (b2 >> 4) & 0x0F
+    sample_rate_index = (b2 >> 2) & 0x03
+    padding = (b2 >> 1) & 0x01
+    channel_mode = (b3 >> 6) & 0x03
+
+    if version == 1 or layer != 1:
+        raise ValueError("only MPEG Layer III is supported")
+    if bitrate_index in (0, 15) or sample_rate_index == 3:
+        raise ValueError("unsupported bitrate or sample rate")
+
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    if version == 3:
+        bitrate = _BITRATES_V1[bitrate_index] * 1000
+        samples = 1152
+        length = 144 * bitrate // sample_rate + padding
+    else:
+        bitrate = _BITRATES_V2[bitrate_index] * 1000
+        samples = 576
+        length = 72 * bitrate // sample_rate + padding
+
+    return FrameInfo(sample_rate, channel_mode, samples, length)
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if len(data) >= 10 and data[:3] == b'ID3':
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+
+def _is_vbr_header(frame: bytes) -> bool:
+    head = frame[:64]
+    return b'Xing' in head or b'Info' in head or b'VBRI' in head
+
+
+def split_frames(data: bytes) -> Tuple[List[bytes], List[FrameInfo]]:
+    """
+    Audio frames of one MP3 file (tags and VBR header frame removed)
+    """
+    end = len(data) - 128 if len(data) >= 128 and data[-128:-125] == b'TAG' else len(data)
+    offset = _skip_id3v2(data)
+
+    frames, infos = [], []
+    while offset < end:
+        info = _parse_header(data, offset)
+        frame = data[offset:offset + info.length]
+        if len(frame) < info.length:
+            # Trailing partial frame; decoders drop it anyway
+            break
+        if frames or not _is_vbr_header(frame):
+            frames.append(frame)
+            infos.append(info)
+        offset += info.length
+
+    return frames, infos
+
+
+def concat(segments: List[bytes]) -> Tuple[bytes, float]:
+    """
+    Join MP3 segments frame by frame; returns (audio, duration in seconds)
+    Raises ValueError if a segment can't be parsed or formats differ.
+    """
+    output = []
+    fmt = None
+    samples = 0
+
+    for segment in segments:
+        frames, infos = split_frames(segment)
+        for info in infos:
+            if fmt is None:
+                fmt = (info.sample_rate, info.channel_mode)
+            elif (info.sample_rate, info.channel_mode) != fmt:
+                raise ValueError("segments use different sample rates or channel modes")
+            samples += info.samples
+        output.extend(frames)
+
+    duration = samples / fmt[0] if fmt else 0.0
+    return b''.join(output), duration
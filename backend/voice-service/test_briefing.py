@@ -0,0 +1,84 @@
+"""
+Tests for the briefing segment cache: Storage fallbacks and shared fetches
+"""
+
+import asyncio
+import logging
+import threading
+
+from storage3.utils import StorageException
+
+from briefing import SegmentCache
+
+
+class _Storage:
+    def __init__(self, error=None):
+        self.error = error
+        self.uploads = []
+
+    def download(self, path):
+        raise self.error
+
+    def upload(self, path, audio, file_options=None):
+        self.uploads.append(path)
+
+
+class _Supabase:
+    def __init__(self, storage):
+        self.storage = self
+        self._bucket = storage
+
+    def from_(self, bucket):
+        return self._bucket
+
+
+def _cache(storage, synthesize=lambda text, voice, model: b'audio'):
+    return SegmentCache(synthesize, lambda: _Supabase(storage))
+
+
+def test_missing_segment_is_synthesized_quietly(caplog):
+    # What the Storage API returns for an absent object
+    missing = StorageException({'statusCode': 400, 'error': 'not_found', 'message': 'Object not found'})
+    cache = _cache(_Storage(missing))
+
+    with caplog.at_level(logging.WARNING, logger='briefing'):
+        assert asyncio.run(cache.fetch('Have a productive day.')) == (b'audio', 'tts')
+
+    assert caplog.records == []
+
+
+def test_storage_errors_are_logged(caplog):
+    denied = StorageException({'statusCode': 403, 'error': 'Unauthorized', 'message': 'invalid signature'})
+    cache = _cache(_Storage(denied))
+
+    with caplog.at_level(logging.WARNING, logger='briefing'):
+        assert asyncio.run(cache.fetch('Have a productive day.')) == (b'audio', 'tts')
+
+    assert [r.getMessage() for r in caplog.records][0].startswith("Segment download failed")
+
+
+def test_waiters_on_inflight_fetch_are_not_hits():
+    release = threading.Event()
+    calls = []
+
+    def synthesize(text, voice, model):
+        calls.append(text)
+        release.wait(1)
+        return b'audio'
+
+    cache = _cache(_Storage(StorageException({'statusCode': 404})), synthesize)
+
+    async def run():
+        first = asyncio.ensure_future(cache.fetch('Good morning.'))
+        await asyncio.sleep(0.05)
+        second = asyncio.ensure_future(cache.fetch('Good morning.'))
+        await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(first, second)
+
+    assert asyncio.run(run()) == [(b'audio', 'tts'), (b'audio', 'shared')]
+    assert calls == ['Good morning.']
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['shared_fetches']) == (0, 1, 1)
+    assert stats['hit_rate'] == 0.0
@@ -0,0 +1,82 @@
+"""
+Tests for mp3.concat() on hand-built Layer III frames (no encoder needed)
+"""
+
+import pytest
+
+import mp3
+
+MPEG1 = 3
+MPEG2 = 2
+
+
+def _frame(version=MPEG1, bitrate_index=9, sample_rate_index=0, channel_mode=3, body=b''):
+    """
+    One silent frame; defaults are MPEG-1 Layer III, 128 kbps, 44.1 kHz, mono
+    """
+    header = bytes([
+        0xFF,
+        0xE0 | (version << 3) | (1 << 1) | 1,  # layer III, no CRC
+        (bitrate_index << 4) | (sample_rate_index << 2),
+        channel_mode << 6,
+    ])
+    info = mp3._parse_header(header, 0)
+    payload = body.ljust(info.length - 4, b'\0')
+    return header + payload
+
+
+def _id3v2(size=20):
+    syncsafe = bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+    return b'ID3\x03\x00\x00' + syncsafe + b'\0' * size
+
+
+def _segment(frames=3, **kwargs):
+    return b''.join(_frame(**kwargs) for _ in range(frames))
+
+
+def test_frame_length_matches_bitrate():
+    # 144 * 128000 / 44100 = 417 bytes per MPEG-1 frame, 72 * 64000 / 24000 = 192 for MPEG-2
+    assert len(_frame()) == 417
+    assert len(_frame(version=MPEG2, bitrate_index=8, sample_rate_index=1)) == 192
+
+
+def test_concat_strips_tags_and_vbr_header():
+    xing = _frame(body=b'\0' * 32 + b'Xing')
+    tagged = _id3v2() + xing + _segment(3) + b'TAG' + b'\0' * 125
+
+    audio, _ = mp3.concat([tagged, _segment(2)])
+
+    assert audio == _segment(5)
+
+
+def test_concat_duration_counts_audio_frames_only():
+    xing = _frame(body=b'\0' * 32 + b'Info')
+    _, duration = mp3.concat([xing + _segment(10), _segment(5)])
+
+    assert duration == pytest.approx(15 * 1152 / 44100)
+
+
+def test_concat_duration_mpeg2():
+    segment = _segment(4, version=MPEG2, bitrate_index=8, sample_rate_index=1)
+    _, duration = mp3.concat([segment])
+
+    assert duration == pytest.approx(4 * 576 / 24000)
+
+
+def test_concat_rejects_mismatched_sample_rates():
+    with pytest.raises(ValueError):
+        mp3.concat([_segment(2), _segment(2, sample_rate_index=1)])
+
+
+def test_concat_rejects_mismatched_channel_modes():
+    with pytest.raises(ValueError):
+        mp3.concat([_segment(2), _segment(2, channel_mode=1)])
+
+
+def test_concat_rejects_garbage():
+    with pytest.raises(ValueError):
+        mp3.concat([b'not an mp3 file'])
+
+
+def test_concat_empty():
+    assert mp3.concat([]) == (b'', 0.0)
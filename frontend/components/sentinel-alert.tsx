@@ -17,6 +17,7 @@ interface Prediction {
   time_to_critical: number | null
   action_plan: any
   created_at: string
+  resolved_at?: string | null
 }
 
 export default function SentinelAlert({ companyId }: SentinelAlertProps) {
@@ -24,25 +25,27 @@ export default function SentinelAlert({ companyId }: SentinelAlertProps) {
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
-    const fetchPrediction = async () => {
+    const apiUrl = process.env.NEXT_PUBLIC_API_GATEWAY_URL || 'http://localhost:3001'
+    // EventSource reconnects on its own and resumes via Last-Event-ID
+    const source = new EventSource(`${apiUrl}/api/sentinel/stream?company_id=${companyId}`)
+
+    const handleUpdate = (event: MessageEvent) => {
       try {
-        const apiUrl = process.env.NEXT_PUBLIC_API_GATEWAY_URL || 'http://localhost:3001'
-        const response = await fetch(`${apiUrl}/api/sentinel/status?company_id=${companyId}`)
-        if (response.ok) {
-          const data = await response.json()
-          setPrediction(data.prediction)
-        }
+        const data = JSON.parse(event.data)
+        const next: Prediction | null = data.prediction
+        setPrediction(next && !next.resolved_at ? next : null)
       } catch (error) {
-        console.error('Error fetching sentinel status:', error)
+        console.error('Error parsing sentinel event:', error)
       } finally {
         setLoading(false)
       }
     }
 
-    fetchPrediction()
-    const interval = setInterval(fetchPrediction, 30000) // Poll every 30 seconds
+    source.addEventListener('snapshot', handleUpdate)
+    source.addEventListener('prediction', handleUpdate)
+    source.onerror = () => setLoading(false)
 
-    return () => clearInterval(interval)
+    return () => source.close()
   }, [companyId])
 
   if (loading || !prediction || prediction.risk_level === 'low') {
@@ -31,6 +31,24 @@ CREATE TABLE IF NOT EXISTS complaints (
 CREATE INDEX IF NOT EXISTS idx_complaints_company_time
 ON complaints(company_id, timestamp);
 
+-- Realtime change events invalidate the services' query cache
+ALTER PUBLICATION supabase_realtime ADD TABLE complaints;
+
+-- Bulk re-score of existing complaints (AI service ingest pipeline).
+-- Only the sentiment columns change, and only for rows of the given company.
+CREATE OR REPLACE FUNCTION apply_complaint_scores(scores JSONB)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  UPDATE complaints AS c
+  SET sentiment = s.sentiment,
+      sentiment_score = s.sentiment_score,
+      category = s.category
+  FROM jsonb_to_recordset(scores)
+    AS s(id BIGINT, company_id TEXT, sentiment TEXT, sentiment_score DECIMAL, category TEXT)
+  WHERE c.id = s.id AND c.company_id = s.company_id;
+$$;
+
 -- Brand profiles table
 CREATE TABLE IF NOT EXISTS brand_profiles (
   id BIGSERIAL PRIMARY KEY,
@@ -39,6 +57,8 @@ CREATE TABLE IF NOT EXISTS brand_profiles (
   last_updated TIMESTAMPTZ DEFAULT NOW()
 );
 
+ALTER PUBLICATION supabase_realtime ADD TABLE brand_profiles;
+
 -- Outage predictions table (for Sentinel feature)
 CREATE TABLE IF NOT EXISTS outage_predictions (
   id BIGSERIAL PRIMARY KEY,
@@ -58,6 +78,8 @@ CREATE TABLE IF NOT EXISTS outage_predictions (
 CREATE INDEX IF NOT EXISTS idx_outage_predictions_company_time
 ON outage_predictions(company_id, created_at);
 
+ALTER PUBLICATION supabase_realtime ADD TABLE outage_predictions;
+
 -- SWOT analyses table
 CREATE TABLE IF NOT EXISTS swot_analyses (
   id BIGSERIAL PRIMARY KEY,
@@ -80,6 +102,8 @@ CREATE TABLE IF NOT EXISTS historical_incidents (
 CREATE INDEX IF NOT EXISTS idx_historical_incidents_company
 ON historical_incidents(company_id, occurred_at);
 
+ALTER PUBLICATION supabase_realtime ADD TABLE historical_incidents;
+
 -- Comments
 COMMENT ON TABLE metrics_timeseries IS 'Real-time metrics tracking (happiness, complaints velocity, etc.)';
 COMMENT ON TABLE complaints IS 'Customer complaints with AI sentiment analysis';